@@ -1,26 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from PIL import Image, ImageTk
-import io
+import os
 import time
-import traceback # Import traceback for detailed error logging
+import logging
+from activity_log import ACTIVITY_LOG_LINES, logger, setup_logging
+from table_view import TableView
+from ui_queue import UIQueue
+from watcher import Watcher
+from metrics import metrics
+from captcha_broker import CaptchaBroker
+from captcha_window import CaptchaWindow
+from lazy import LazyModule
+from records import Table, marks_components
+from snapshot_store import SnapshotStore
+
+# Heavy dependencies load in the background once the window is up, or on first use
+browser = LazyModule("browser")
+engine = LazyModule("engine")
+internal_marks = LazyModule("internal_marks")
+session_store = LazyModule("session_store")
+
+PREWARM = os.environ.get("CUIMS_PREWARM", "1") != "0" # Launch the login browser at startup
 
 class CUCHDPortalGUI:
-    def __init__(self, root):
+    def __init__(self, root, prewarm=PREWARM):
         self.root = root
         self.root.title("CUCHD Student Portal Checker")
         self.root.geometry("1500x800")
         self.root.resizable(False, False)
-        self.driver = None
+        # Created by load_machinery once Selenium and friends are imported
+        self.client = None # Login and page loading, shared with the batch engine
+        self.session_store = None
+        self.warm_browser = None
+        self.machinery_ready = threading.Event()
+        self.closed = False
+        self.fetching = False # A full fetch owns self.client; the watcher is restarted when it succeeds
+        self.shown_uid = None # Whose data the tables currently hold
+        self.data = {} # Page name -> records.Table for shown_uid; what the tabs and the calculator show
+        self.watcher = None
+        self.watch_enabled = False
 
         # Apply a ttk theme for better aesthetics
         self.style = ttk.Style()
@@ -61,6 +80,10 @@ class CUCHDPortalGUI:
         self.login_btn.pack(side="left", padx=(0, 5), expand=True) # Aligned left
         self.clear_btn = ttk.Button(button_frame, text="Clear Data", width=25, command=self.clear_data)
         self.clear_btn.pack(side="right", padx=(5, 0), expand=True) # Aligned right
+        self.use_http = tk.BooleanVar(value=True)
+        ttk.Checkbutton(button_frame, text="Fast fetch (HTTP after login)", variable=self.use_http).pack(side="left", padx=5)
+        self.watch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Watch for changes", variable=self.watch_var, command=self.toggle_watch).pack(side="left", padx=5)
 
 
         # Activity Log
@@ -68,7 +91,16 @@ class CUCHDPortalGUI:
         log_frame.pack(fill="both", expand=False, padx=15, pady=10) # Increased padding
         self.activity_log = tk.Text(log_frame, height=8, wrap="word", font=('Helvetica', 9)) # Slightly smaller font for log
         self.activity_log.pack(fill="both", expand=True, padx=5, pady=5) # Padding inside log frame
+        # Every widget update from a worker thread goes through this queue
+        self.ui = UIQueue(root, self.write_log)
+        self.ui.start()
+        # The widget keeps the last lines only; the full stream, tracebacks included, goes to ~/.cuims/logs
+        self.activity_log_lines = ACTIVITY_LOG_LINES
+        setup_logging(self.ui.post_log, debug=os.environ.get("CUIMS_DEBUG", "0") != "0")
         self.log("GUI Initialized. Please login to continue.")
+        # Logins queue their captchas here and the one captcha window works through them in order
+        self.captcha = CaptchaBroker(on_change=lambda: self.ui.post(self.captcha_window.refresh))
+        self.captcha_window = CaptchaWindow(root, self.captcha)
 
         # Data Tabs
         data_frame = ttk.LabelFrame(root, text="Fetched Data")
@@ -77,15 +109,15 @@ class CUCHDPortalGUI:
         self.notebook.pack(fill="both", expand=True, padx=5, pady=5) # Padding inside data frame
 
         self.attendance_tab = ttk.Frame(self.notebook)
-        self.attendance_table = self.create_table(self.attendance_tab)
+        self.attendance_table = self.create_table(self.attendance_tab) # Rows keyed by course code
         self.notebook.add(self.attendance_tab, text="Attendance")
 
         self.marks_tab = ttk.Frame(self.notebook)
-        self.marks_table = self.create_table(self.marks_tab)
+        self.marks_table = self.create_table(self.marks_tab, key_width=2) # Keyed by course and component
         self.notebook.add(self.marks_tab, text="Marks")
 
         self.timetable_tab = ttk.Frame(self.notebook)
-        self.timetable_table = self.create_table(self.timetable_tab)
+        self.timetable_table = self.create_table(self.timetable_tab) # Keyed by time slot
         self.notebook.add(self.timetable_tab, text="Timetable")
 
         # Marks Calculator Tab
@@ -93,6 +125,33 @@ class CUCHDPortalGUI:
         self.notebook.add(self.calculator_tab, text="Marks Calculator")
         self.setup_calculator_tab()
 
+        self.tables = {
+            "attendance": self.attendance_table,
+            "marks": self.marks_table,
+            "timetable": self.timetable_table,
+        }
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Show the last fetched data straight away; a login refreshes it
+        self.snapshots = SnapshotStore()
+        threading.Thread(target=self.load_latest_snapshot, daemon=True).start()
+        threading.Thread(target=self.load_machinery, args=(prewarm,), name="load-machinery", daemon=True).start()
+
+    def load_machinery(self, prewarm):
+        """Pre-warm the login browser and import the fetch machinery off the Tk thread"""
+        try:
+            if prewarm and not self.closed:
+                # Launch Chrome and open the login page before anyone asks to log in
+                self.warm_browser = browser.WarmBrowser().start()
+            self.client = engine.PortalClient(log=self.log)
+            self.session_store = session_store.SessionStore()
+            internal_marks.load()
+        except Exception as e:
+            self.log(f"❌ Could not load the fetch machinery: {e}", level=logging.ERROR, exc_info=True)
+        finally:
+            self.machinery_ready.set()
+
 
     # Moved methods to be defined immediately after __init__ to resolve AttributeError
     def start_full_fetch(self):
@@ -101,35 +160,8 @@ class CUCHDPortalGUI:
         if not uid or not pwd:
             messagebox.showerror("Input Error", "Please enter both UID and Password.")
             return
-        threading.Thread(target=self.full_fetch, args=(uid, pwd), daemon=True).start()
-
-    def get_captcha_input_gui(self, image_data):
-        root = tk.Toplevel()
-        root.title("Enter Captcha")
-        root.geometry("300x200")
-        root.attributes("-topmost", True)
-        captcha_var = tk.StringVar()
-
-        image = Image.open(io.BytesIO(image_data))
-        photo = ImageTk.PhotoImage(image)
-
-        label_image = ttk.Label(root, image=photo)
-        label_image.image = photo
-        label_image.pack(pady=5)
-
-        ttk.Label(root, text="Please enter the captcha:").pack(pady=5)
-        entry = ttk.Entry(root, textvariable=captcha_var, justify="center")
-        entry.pack(pady=5)
-        entry.focus_set()
+        threading.Thread(target=self.full_fetch, args=(uid, pwd, self.use_http.get()), daemon=True).start()
 
-        ttk.Button(root, text="Submit", command=root.destroy).pack(pady=10)
-        root.bind("<Return>", lambda e=None: root.destroy())
-        root.grab_set()
-        root.wait_window()
-        return captcha_var.get()
-
-    
-    
     def bind_mousewheel_to_children(self, widget):
         def _bind_all_children(w):
             w.bind("<Enter>", lambda e: self.canvas.bind_all("<MouseWheel>", self._on_mousewheel))
@@ -160,6 +192,15 @@ class CUCHDPortalGUI:
         # Calculation button
         ttk.Button(self.calculator_tab, text="Load Calculator", command=self.load_calculator, style='TButton').pack(pady=15) # Increased padding
 
+        # Every course at once, straight from the fetched marks
+        summary_frame = ttk.LabelFrame(self.calculator_tab, text="All Courses (from fetched marks)")
+        summary_frame.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+        summary_buttons = ttk.Frame(summary_frame)
+        summary_buttons.pack(fill="x", padx=5, pady=(5, 0))
+        ttk.Button(summary_buttons, text="Summary", command=self.show_marks_summary).pack(side="left", padx=5)
+        ttk.Button(summary_buttons, text="What-if for Selected Course", command=self.show_what_if).pack(side="left", padx=5)
+        self.summary_table = self.create_table(summary_frame)
+
         # Calculator container - now a scrollable area
         scroll_container = ttk.Frame(self.calculator_tab)
         scroll_container.pack(fill="both", expand=True, padx=15, pady=10) # Increased padding
@@ -212,11 +253,28 @@ class CUCHDPortalGUI:
 
     def update_course_list(self):
         """Update the dropdown with courses from marks data"""
-        courses = set()
-        for child in self.marks_table.get_children():
-            course = self.marks_table.item(child)['values'][0]
-            courses.add(course)
-        self.course_combobox['values'] = sorted(courses)
+        marks = self.data.get("marks")
+        self.course_combobox['values'] = sorted(marks.courses()) if marks else []
+        self.show_marks_summary()
+
+    def show_marks_summary(self):
+        """Internal marks for every fetched course in one table"""
+        marks = self.data.get("marks")
+        if marks is None:
+            self.summary_table.clear()
+            return
+        summary = internal_marks.summary(marks_components(marks))
+        self.summary_table.set_data(list(summary.columns), summary.values.tolist())
+
+    def show_what_if(self):
+        """Internal marks of the selected course for a range of MST 2 (and end-sem) scores"""
+        course = self.course_var.get()
+        marks = self.data.get("marks")
+        if not course or marks is None:
+            messagebox.showerror("Error", "Please select a course first")
+            return
+        columns, rows = internal_marks.what_if_grid(marks_components(marks), course)
+        self.summary_table.set_data(columns, rows)
 
     
     def load_calculator(self):
@@ -336,13 +394,8 @@ class CUCHDPortalGUI:
                     # Treat empty worksheet fields as 0 for calculation
                     worksheet_total += 0
 
-            # Perform calculations
-            s = (surprise_test / 12) * 4
-            n = (labmst / 10) * 15
-            worksheet = (worksheet_total / 300) * 45
-            m = (mst_1 + mst_2) / 2
-
-            total = ((assignment + quiz + m + attendance + s + worksheet + end + n) / 140) * 70
+            total = internal_marks.hybrid_total(assignment, attendance, surprise_test, quiz, mst_1, mst_2,
+                                                end, labmst, worksheet_total)
             
             # Display result in a pop-up window
             messagebox.showinfo("Internal Marks Calculation", f"Your internal marks for {self.course_var.get()}: {total:.2f}")
@@ -353,7 +406,7 @@ class CUCHDPortalGUI:
             self.log(f"Input Error in Hybrid Calculator: {e}")
         except Exception as e:
             messagebox.showerror("Calculation Error", "An unexpected error occurred during calculation. Check the log.")
-            self.log(f"Error in Hybrid Calculator: {e}\n{traceback.format_exc()}") # Log full traceback
+            self.log(f"Error in Hybrid Calculator: {e}", level=logging.ERROR, exc_info=True) # Full traceback goes to the log file
 
 
     def calculate_nonhybrid(self):
@@ -367,10 +420,7 @@ class CUCHDPortalGUI:
             mst_1 = float(self.nonhybrid_vars["mst_1"].get())
             mst_2 = float(self.nonhybrid_vars["mst_2"].get())
 
-            # Perform calculations
-            s = (surprise_test / 12) * 4
-            m = (mst_1 + mst_2) / 2
-            total = assignment + quiz + m + attendance + s
+            total = internal_marks.nonhybrid_total(assignment, attendance, surprise_test, quiz, mst_1, mst_2)
             
             # Display result in a pop-up window
             messagebox.showinfo("Internal Marks Calculation", f"Your internal marks for {self.course_var.get()}: {total:.2f}")
@@ -381,183 +431,216 @@ class CUCHDPortalGUI:
             self.log(f"Input Error in Non-Hybrid Calculator: {e}")
         except Exception as e:
             messagebox.showerror("Calculation Error", "An unexpected error occurred during calculation. Check the log.")
-            self.log(f"Error in Non-Hybrid Calculator: {e}\n{traceback.format_exc()}") # Log full traceback
+            self.log(f"Error in Non-Hybrid Calculator: {e}", level=logging.ERROR, exc_info=True) # Full traceback goes to the log file
 
-    def full_fetch(self, uid, pwd):
+    def full_fetch(self, uid, pwd, use_http=True):
+        self.machinery_ready.wait()
+        if self.client is None:
+            self.log("❌ Fetching is unavailable, see the log file for details.")
+            return
+        # The watcher polls through self.client, which is about to switch sessions and maybe accounts
+        self.fetching = True
+        self.stop_watch(wait=True)
         try:
-            self.log("Starting headless browser and logging in...")
-            chrome_options = webdriver.ChromeOptions()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option("useAutomationExtension", False)
-
-            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-            wait = WebDriverWait(self.driver, 30)
-
-            self.driver.get("https://students.cuchd.in/")
-            wait.until(EC.presence_of_element_located((By.ID, "txtUserId"))).send_keys(uid)
-            self.driver.find_element(By.ID, "btnNext").click()
-
-            wait.until(EC.presence_of_element_located((By.ID, "txtLoginPassword"))).send_keys(pwd)
-            captcha_element = wait.until(EC.presence_of_element_located((By.ID, "imgCaptcha")))
-            captcha_data = captcha_element.screenshot_as_png
-            captcha_text = self.get_captcha_input_gui(captcha_data)
-            self.driver.find_element(By.ID, "txtcaptcha").send_keys(captcha_text)
-            self.driver.find_element(By.ID, "btnLogin").click()
-
-            wait.until(EC.url_contains("StudentHome.aspx"))
-            self.log("✅ Login successful!")
-
-            # Fetch all data:
-            self.fetch_attendance()
-            self.fetch_marks()
-            self.fetch_timetable()
-
-            # Update course list in calculator
-            self.update_course_list()
+            if uid != self.shown_uid:
+                self.client.page_hashes = {}
+            self.client.use_http = use_http
+            saved = self.session_store.load(uid, pwd) if use_http else None
+            if not (saved and self.client.resume(saved)):
+                self.login(uid, pwd)
 
-        except Exception as e:
-            self.log("❌ Login or fetch failed: " + str(e))
+            # Fetch all data concurrently, then hand the changed tables to the UI and the snapshot store
+            same_account = uid == self.shown_uid
+            self.shown_uid = uid
+            for table in self.fetch_all_pages().values():
+                self.apply_page(uid, table, diff=same_account)
 
-    def fetch_attendance(self):
-        try:
-            self.log("Fetching attendance...")
-            self.driver.get("https://students.cuchd.in/frmStudentCourseWiseAttendanceSummary.aspx?type=etgkYfqBdH1fSfc255iYGw==")
-            time.sleep(3)
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            table = soup.find("table", {"id": "SortTable"})
-            if not table:
-                self.log("❌ Attendance table not found.")
-                return
-            headers = [th.text.strip() for th in table.find_all("th")]
-            rows = [[td.text.strip() for td in tr.find_all("td")[:-1]] for tr in table.find("tbody").find_all("tr")]
-            df = pd.DataFrame(rows, columns=headers[:-1])
-            self.populate_table(self.attendance_table, df)
-            self.log("✅ Attendance fetched.")
-        except Exception as e:
-            self.log("❌ Error fetching attendance: " + str(e))
+            if self.client.http is not None:
+                self.session_store.save(uid, pwd, self.client.saved_session(saved))
 
-    def fetch_marks(self):
-        try:
-            self.log("Fetching marks...")
-            self.driver.get("https://students.cuchd.in/frmStudentMarksView.aspx")
-            time.sleep(3)
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            all_data = []
-            for div in soup.select(".ui-accordion-content"):
-                course = div.find_previous("h3").get_text(strip=True)
-                table = div.find("table")
-                if not table: continue
-                headers = [th.get_text(strip=True) for th in table.find_all("th")]
-                for row in table.find("tbody").find_all("tr"):
-                    cells = [td.get_text(strip=True) for td in row.find_all("td")]
-                    if len(cells) == len(headers):
-                        record = dict(zip(headers, cells))
-                        record["Course"] = course
-                        all_data.append(record)
-            df = pd.DataFrame(all_data)
-            if not df.empty:
-                df = df[["Course"] + [col for col in df.columns if col != "Course"]]
-            self.populate_table(self.marks_table, df)
-            self.log("✅ Marks fetched.")
-        except Exception as e:
-            self.log("❌ Error fetching marks: " + str(e))
+            # Update course list in calculator once the marks table has been applied
+            self.ui.post(self.update_course_list)
 
-    def fetch_timetable(self):
+            if self.watch_enabled:
+                self.start_watch(uid)
+
+        except Exception as e:
+            self.log("❌ Login or fetch failed: " + str(e))
+        finally:
+            self.fetching = False
+
+    def login(self, uid, pwd):
+        self.log("Starting headless browser and logging in...")
+        # The previous login's browser is of no further use
+        self.client.close()
+        # A warm browser serves a single login; later logins start their own
+        warm_browser, self.warm_browser = self.warm_browser, None
+        driver = warm_browser.take() if warm_browser else None
+        if warm_browser and warm_browser.error:
+            self.log(f"⚠️ Pre-warmed browser unavailable: {warm_browser.error}")
+        on_login_page = driver is not None
+        if driver is None:
+            driver = browser.launch_browser()
+        self.client.login(driver, uid, pwd, self.captcha, on_login_page)
+
+    def fetch_all_pages(self):
+        """Download and parse the data pages in parallel; returns {page: Table} for the pages that changed"""
+        self.log("Fetching attendance, marks and timetable...")
+        tables, errors = self.client.fetch_tables()
+        for page in engine.PAGES:
+            if page in errors:
+                continue # Logged by the client, traceback included
+            if page in tables:
+                self.log(f"✅ {page.capitalize()} fetched.")
+            else:
+                self.log(f"✅ {page.capitalize()} unchanged.")
+                # The highlights describe the refresh before this one
+                self.ui.post(self.tables[page].clear_highlights)
+        return tables
+
+    def apply_page(self, uid, table, diff=True):
+        """Show a freshly parsed page and record it as a snapshot"""
+        self.data[table.page] = table
+        self.populate_table(self.tables[table.page], table.columns, table.rows, diff=diff)
+        self.snapshots.save(uid, table.page, table.columns, table.rows)
+
+    def toggle_watch(self):
+        self.watch_enabled = self.watch_var.get()
+        if not self.watch_enabled:
+            self.stop_watch()
+            self.log("⏸️ Watch mode off.")
+        elif self.fetching:
+            self.log("Watch mode will start after the current fetch.")
+        elif self.shown_uid and self.client and (self.client.http is not None or self.client.driver is not None):
+            self.start_watch(self.shown_uid)
+        else:
+            self.log("Watch mode will start after the next login.")
+
+    def start_watch(self, uid):
+        """Keep re-fetching each page on its own interval using the current session"""
+        self.stop_watch()
+        self.watcher = Watcher(
+            {page: (lambda page=page: self.client.fetch_table(page)) for page in engine.PAGES},
+            on_change=lambda page, table: self.on_watch_change(uid, page, table),
+            on_error=lambda page, e: self.log(f"⚠️ Watch: {page} check failed, backing off."),
+        ).start()
+        intervals = ", ".join(f"{s.name} every {s.interval / 60:g} min" for s in self.watcher.schedules)
+        self.log(f"👀 Watch mode on: {intervals}.")
+
+    def stop_watch(self, wait=False):
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop(wait)
+
+    def on_watch_change(self, uid, page, table):
+        self.apply_page(uid, table)
+        if page == "marks":
+            self.ui.post(self.update_course_list)
+        if page in ("attendance", "marks"):
+            self.ui.post(self.show_notification, f"{page.capitalize()} updated",
+                         f"New {page} data for {uid} is highlighted in the {page.capitalize()} tab.")
+
+    def show_notification(self, title, message, duration_ms=8000):
+        """Small always-on-top toast in the corner of the screen that closes itself"""
+        self.log(f"🔔 {title}: {message}")
+        toast = tk.Toplevel(self.root)
+        toast.title(title)
+        toast.attributes("-topmost", True)
+        toast.resizable(False, False)
+        ttk.Label(toast, text=title, font=('Helvetica', 11, 'bold')).pack(padx=15, pady=(10, 2), anchor="w")
+        ttk.Label(toast, text=message, wraplength=300).pack(padx=15, pady=(0, 10), anchor="w")
+        toast.update_idletasks()
+        x = toast.winfo_screenwidth() - toast.winfo_width() - 20
+        y = toast.winfo_screenheight() - toast.winfo_height() - 60
+        toast.geometry(f"+{x}+{y}")
+        toast.bind("<Button-1>", lambda e: toast.destroy())
+        toast.after(duration_ms, toast.destroy)
+        self.root.bell()
+
+    def load_latest_snapshot(self):
+        """Fill the tabs from the newest stored snapshot of the last UID"""
         try:
-            self.log("Fetching timetable...")
-            self.driver.get("https://students.cuchd.in/frmMyTimeTable.aspx")
-            time.sleep(3)
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-
-            # Debug: Print raw HTML of course detail table
-            course_table_html = soup.find("table", {"id": "ContentPlaceHolder1_grdCourseDetail"})
-            if not course_table_html:
-                self.log("⚠️ Course detail table not found")
-
-            # Get course code to title mapping
-            course_mapping = {}
-            if course_table_html:
-                for row in course_table_html.find_all("tr")[1:]:  # skip header
-                    cols = [td.get_text(strip=True) for td in row.find_all("td")]
-                    if len(cols) >= 2:
-                        code = cols[0].strip()
-                        title = cols[1].strip()
-                        course_mapping[code] = title
-                        # Debug: Log the mapping
-                        self.log(f"Mapping: {code} → {title}")
-
-            # Get timetable
-            timetable = soup.find("table", {"id": "ContentPlaceHolder1_grdMain"})
-            if not timetable:
-                self.log("❌ Timetable table not found.")
+            uid = self.snapshots.latest_uid()
+            if uid is None:
                 return
+            latest = self.snapshots.latest(uid)
+            for page, snapshot in latest.items():
+                if page in self.tables:
+                    table = self.data[page] = Table(page, snapshot.columns, snapshot.rows)
+                    self.populate_table(self.tables[page], table.columns, table.rows)
+            self.shown_uid = uid
+            self.ui.post(self.show_snapshot_uid, uid)
+            internal_marks.load() # Pays for the pandas import here rather than on the Tk thread
+            self.ui.post(self.update_course_list)
+            fetched_at = time.strftime("%d %b %H:%M", time.localtime(max(s.fetched_at for s in latest.values())))
+            self.log(f"📂 Showing saved data for {uid} from {fetched_at}. Login to refresh.")
+        except Exception as e:
+            self.log("⚠️ Could not load saved data: " + str(e))
 
-            headers = [th.get_text(strip=True) for th in timetable.find("tr").find_all("th")]
-            rows = []
-
-            for tr in timetable.find_all("tr")[1:]:
-                cols = [td.get_text(strip=True) for td in tr.find_all("td")]
-                if not cols:
-                    continue
+    def show_snapshot_uid(self, uid):
+        if not self.uid_entry.get():
+            self.uid_entry.insert(0, uid)
 
-                processed_cols = []
-                for col in cols:
-                    # Try to find course code in the cell text
-                    found_code = None
-                    for code in course_mapping:
-                        if code in col:  # Look for code anywhere in cell text
-                            found_code = code
-                            break
+    def create_table(self, parent, key_width=1):
+        return TableView(parent, key_width=key_width)
 
-                    if found_code:
-                        # Replace just the code portion, keep any other text
-                        new_text = col.replace(found_code, course_mapping[found_code])
-                        processed_cols.append(new_text)
-                    else:
-                        processed_cols.append(col)
+    def populate_table(self, table, columns, rows, diff=True):
+        # A refresh only touches changed rows and highlights them; a different account's data replaces the table
+        self.ui.post(self._populate, table, columns, rows, diff)
 
-                rows.append(processed_cols)
+    def _populate(self, table, columns, rows, diff):
+        page = next((name for name, t in self.tables.items() if t is table), "other")
+        # set_data fills large tables over several event-loop ticks, so the span ends on on_done
+        started = time.perf_counter()
 
-            df = pd.DataFrame(rows, columns=headers)
-            self.populate_table(self.timetable_table, df)
-            self.log("✅ Timetable fetched with course titles.")
+        def done(ok=True):
+            metrics.record("ui.populate", time.perf_counter() - started, ok, page=page)
 
-        except Exception as e:
-            self.log(f"❌ Error fetching timetable: {str(e)}")
-            import traceback
-            self.log(traceback.format_exc())
-
-
-    def create_table(self, parent):
-        tree = ttk.Treeview(parent)
-        tree.pack(fill="both", expand=True, padx=5, pady=5) # Added padding to treeview
-        return tree
-
-    def populate_table(self, tree, df):
-        tree.delete(*tree.get_children())
-        tree["columns"] = list(df.columns)
-        tree["show"] = "headings"
-        for col in df.columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=120, anchor="center")
-        for _, row in df.iterrows():
-            tree.insert("", "end", values=list(row))
+        try:
+            (table.update_data if diff else table.set_data)(columns, rows, on_done=done)
+        except Exception:
+            done(ok=False)
+            raise
 
     def clear_data(self):
-        self.attendance_table.delete(*self.attendance_table.get_children())
-        self.marks_table.delete(*self.marks_table.get_children())
-        self.timetable_table.delete(*self.timetable_table.get_children())
+        self.attendance_table.clear()
+        self.marks_table.clear()
+        self.timetable_table.clear()
+        self.summary_table.clear()
+        self.data = {}
+        self.stop_watch()
+        if self.client is not None:
+            self.client.page_hashes = {} # Empty tables must be refilled by the next fetch
         self.activity_log.delete("1.0", "end")
         self.result_var.set("") # Clear the label text as well
         self.log("🧹 Cleared all data.")
 
-    def log(self, message):
-        self.activity_log.insert("end", message + "\n")
+    def on_close(self):
+        self.closed = True
+        self.ui.stop()
+        self.stop_watch()
+        self.captcha.close() # Unblocks a login still waiting for its captcha
+        try:
+            metrics.write_prometheus()
+        except OSError:
+            pass
+        self.root.destroy()
+        # The window is gone, but a browser still launching would outlive the process's daemon threads
+        self.machinery_ready.wait()
+        if self.warm_browser is not None:
+            self.warm_browser.close(wait=True)
+        if self.client is not None:
+            self.client.close()
+
+    def log(self, message, level=logging.INFO, exc_info=False):
+        logger.log(level, message, exc_info=exc_info)
+
+    def write_log(self, lines):
+        self.activity_log.insert("end", "".join(line + "\n" for line in lines))
+        # Trim from the top so the widget never holds more than activity_log_lines
+        excess = int(self.activity_log.index("end-1c").split(".")[0]) - 1 - self.activity_log_lines
+        if excess > 0:
+            self.activity_log.delete("1.0", f"{excess + 1}.0")
         self.activity_log.see("end")
 
 # Run the GUI
@@ -0,0 +1,60 @@
+"""Logging setup: the Activity Log widget's feed plus a size-rotated file with the full stream."""
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+
+from portal import CACHE_DIR
+
+LOG_FILE = os.path.join(CACHE_DIR, "logs", "cuims.log")
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+ACTIVITY_LOG_LINES = 500 # Lines kept in the Activity Log widget
+
+logger = logging.getLogger("cuims")
+
+
+class MessageOnlyFormatter(logging.Formatter):
+    """Just the message: tracebacks belong in the log file, not the widget"""
+
+    def format(self, record):
+        return record.getMessage()
+
+
+class SinkHandler(logging.Handler):
+    """Forwards each formatted message to `sink`, e.g. the queue feeding the Activity Log widget"""
+
+    def __init__(self, sink):
+        super().__init__()
+        self.sink = sink
+        self.setFormatter(MessageOnlyFormatter())
+
+    def emit(self, record):
+        try:
+            self.sink(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def setup_logging(sink, debug=False, log_file=LOG_FILE):
+    """Attach the activity-log sink and rotating file to the "cuims" logger.
+
+    Below-threshold calls such as logger.debug() return before any formatting, so debug
+    output is free when debug is off.
+    """
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.addHandler(SinkHandler(sink))
+
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"⚠️ Log file unavailable: {e}")
+        else:
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"))
+            logger.addHandler(file_handler)
@@ -0,0 +1,133 @@
+"""Fetch attendance, marks and timetable for many accounts without the GUI.
+
+    python batch.py accounts.csv -j 4 -o results/
+
+accounts.csv has a header row with "uid" and "password" columns. Each account's
+result is written to <output>/<uid>.json and a summary to <output>/summary.json.
+Captchas are saved as PNG files and answered at the console, or with --captcha-window in one
+window that works through every waiting login's captcha in turn.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+
+import engine
+from activity_log import logger
+from metrics import metrics
+
+
+def read_accounts(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["uid"].strip(), row["password"]) for row in csv.DictReader(f) if row.get("uid", "").strip()]
+
+
+class ConsoleCaptchaSolver:
+    """Saves each captcha image and asks for its text on stdin, one account at a time"""
+
+    def __init__(self, captcha_dir):
+        self.captcha_dir = captcha_dir
+        self._lock = threading.Lock()
+
+    def __call__(self, uid, image_data):
+        os.makedirs(self.captcha_dir, exist_ok=True)
+        path = os.path.join(self.captcha_dir, f"{uid}.png")
+        with open(path, "wb") as f:
+            f.write(image_data)
+        with self._lock:
+            return input(f"Captcha for {uid} (see {path}): ").strip()
+
+
+def run_with_captcha_window(run):
+    """Run run(broker) on a worker thread while the Tk main loop serves the captcha window"""
+    import tkinter as tk
+
+    from captcha_broker import CaptchaBroker
+    from captcha_window import CaptchaWindow
+    from ui_queue import UIQueue
+
+    root = tk.Tk()
+    root.withdraw()
+    ui = UIQueue(root, lambda lines: None)
+    broker = CaptchaBroker()
+    window = CaptchaWindow(root, broker)
+    broker.on_change = lambda: ui.post(window.refresh)
+    outcome = {}
+
+    def work():
+        try:
+            outcome["results"] = run(broker)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            ui.post(root.quit)
+
+    ui.start()
+    threading.Thread(target=work, name="batch", daemon=True).start()
+    root.mainloop()
+    broker.close()
+    root.destroy()
+    if "error" in outcome:
+        raise outcome["error"]
+    if "results" not in outcome:
+        raise SystemExit("Batch interrupted")
+    return outcome["results"]
+
+
+def write_result(output_dir, result):
+    with open(os.path.join(output_dir, f"{result.uid}.json"), "w", encoding="utf-8") as f:
+        json.dump(result.to_dict(), f, ensure_ascii=False, indent=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch portal data for many accounts.")
+    parser.add_argument("accounts", help="CSV file with uid,password columns")
+    parser.add_argument("-o", "--output", default="results", help="directory for per-account JSON results")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="accounts in flight / headless browsers in the pool")
+    parser.add_argument("--timeout", type=float, default=engine.ACCOUNT_TIMEOUT,
+                        help="seconds per account, not counting captcha answers")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="parse pages on this many worker processes (default: in the fetch threads)")
+    parser.add_argument("--no-http", action="store_true", help="load data pages in the browser instead of over HTTP")
+    parser.add_argument("--captcha-dir", default=os.path.join("results", "captchas"))
+    parser.add_argument("--captcha-window", action="store_true", help="answer captchas in a window instead of the console")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(message)s")
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    accounts = read_accounts(args.accounts)
+    os.makedirs(args.output, exist_ok=True)
+
+    def on_result(result):
+        write_result(args.output, result)
+        logger.info(f"[{result.uid}] {result.status} in {result.elapsed:.1f}s"
+                    + (f" ({'; '.join(f'{k}: {v}' for k, v in result.errors.items())})" if result.errors else ""))
+
+    def run(solve_captcha):
+        return engine.run_batch(accounts, solve_captcha, pool_size=args.jobs,
+                                use_http=not args.no_http, timeout=args.timeout, on_result=on_result,
+                                parse_workers=args.parse_workers)
+
+    results = run_with_captcha_window(run) if args.captcha_window else run(ConsoleCaptchaSolver(args.captcha_dir))
+
+    summary = {
+        "accounts": len(results),
+        "by_status": {status: sum(r.status == status for r in results) for status in ("ok", "partial", "failed", "timeout")},
+        "results": [{"uid": r.uid, "status": r.status, "resumed": r.resumed, "elapsed": r.elapsed, "errors": r.errors}
+                    for r in results],
+    }
+    with open(os.path.join(args.output, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=1)
+    # Per-phase timings of this run, next to the results
+    metrics.write_prometheus(os.path.join(args.output, "metrics.prom"))
+    print(json.dumps(summary["by_status"]))
+    return 0 if all(r.status == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""End-to-end benchmarks against the local fake portal, compared with a stored baseline.
+
+    python benchmarks/bench_e2e.py [--quick] [--save-baseline] [--tolerance 0.25] [--padding-kb 8] [--browser]
+
+Scenarios scale from one course to hundreds and from one account to many:
+
+    fetch/<n>       one account resuming a saved session and fetching all pages (HTTP)
+    batch/<a>x<n>   a accounts fetched by run_batch over a portal with 20 ms latency
+    parse/<n>       parsing all three pages
+    marks/<n>       the all-courses internal-marks summary
+    ui/<n>          filling the marks TableView until every chunk is inserted (needs a display)
+    login/<a>       full browser logins through the fake login form (--browser, needs Chrome)
+
+Each scenario's median time is compared with benchmarks/baseline.json; anything slower by more
+than the tolerance is reported and the exit status is 1. Baselines are machine-specific, so
+save one (--save-baseline) on the machine the comparison runs on.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from fake_portal import FakePortal, synthetic_pages  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+MIN_REGRESSION = 0.005 # Seconds; differences below this are timer noise
+COURSES = (1, 8, 50, 200, 500)
+ACCOUNTS = (1, 10, 50)
+QUICK_COURSES = (1, 8, 50)
+QUICK_ACCOUNTS = (1, 10)
+BATCH_LATENCY = 0.02
+PASSWORD = "bench"
+
+fake = None # The FakePortal, started by start_portal()
+
+
+def start_portal(padding_kb):
+    """Start the fake portal, then import the app's modules pointed at it.
+
+    The portal address and local state are read at import time, so the environment has to
+    name the fake portal and a scratch directory first.
+    """
+    global fake, engine, internal_marks, parsers, Table, marks_components, SavedSession, SessionStore
+    fake = FakePortal(padding_kb=padding_kb).start()
+    os.environ["CUIMS_PORTAL_URL"] = fake.url
+    os.environ["CUIMS_CACHE_DIR"] = tempfile.mkdtemp(prefix="cuims-bench-")
+    os.environ["CUIMS_METRICS_FILE"] = ""
+
+    import engine
+    import internal_marks
+    import parsers
+    from records import Table, marks_components
+    from session_store import SavedSession, SessionStore
+
+
+class NoBrowserPool:
+    """Every account resumes a saved session, so nothing should ask for a browser"""
+
+    def acquire(self):
+        raise RuntimeError("benchmark account needed a browser login")
+
+    def release(self, driver, healthy=True):
+        pass
+
+    def close(self):
+        pass
+
+
+def median_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def seed_sessions(store, count):
+    uids = [f"BENCH{i:04d}" for i in range(count)]
+    for uid in uids:
+        store.save(uid, PASSWORD, SavedSession([fake.new_session(uid)], "bench"))
+    return [(uid, PASSWORD) for uid in uids]
+
+
+def check(results):
+    failed = [r for r in results if r.status != "ok"]
+    if failed:
+        raise SystemExit(f"{failed[0].uid} {failed[0].status}: {failed[0].errors}")
+
+
+def bench_fetch(courses, repeat):
+    store = SessionStore(os.path.join(os.environ["CUIMS_CACHE_DIR"], "sessions"))
+    (uid, pwd), = seed_sessions(store, 1)
+    return median_time(lambda: check([engine.fetch_account(uid, pwd, NoBrowserPool(), None, session_store=store)]),
+                       repeat)
+
+
+def bench_batch(accounts, repeat):
+    store = SessionStore(os.path.join(os.environ["CUIMS_CACHE_DIR"], "sessions"))
+    batch = seed_sessions(store, accounts)
+    fake.latency = BATCH_LATENCY
+    try:
+        return median_time(lambda: check(engine.run_batch(batch, None, pool_size=min(accounts, 8),
+                                                          session_store=store, pool=NoBrowserPool())), repeat)
+    finally:
+        fake.latency = 0.0
+
+
+def bench_parse(pages, repeat):
+    return median_time(lambda: [parsers.parse_table(name, html) for name, html in pages.items()], repeat)
+
+
+def bench_marks(pages, repeat):
+    marks = Table("marks", *parsers.parse_table("marks", pages["marks"])[:2])
+    return median_time(lambda: internal_marks.summary(marks_components(marks)), repeat)
+
+
+def bench_ui(root, pages, repeat):
+    from table_view import TableView
+
+    columns, rows, _ = parsers.parse_table("marks", pages["marks"])
+    table = TableView(root, key_width=2)
+
+    def fill():
+        table.set_data(columns, rows)
+        while table._job is not None:
+            root.update()
+
+    return median_time(fill, repeat)
+
+
+def bench_login(accounts):
+    fake.captcha = "bench"
+    store = SessionStore(os.path.join(os.environ["CUIMS_CACHE_DIR"], "login-sessions"))
+    batch = [(f"LOGIN{i:04d}", PASSWORD) for i in range(accounts)]
+    start = time.perf_counter()
+    check(engine.run_batch(batch, lambda uid, image: "bench", pool_size=min(accounts, 4), session_store=store))
+    return time.perf_counter() - start
+
+
+def tk_root():
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def run(args):
+    courses = QUICK_COURSES if args.quick else COURSES
+    accounts = QUICK_ACCOUNTS if args.quick else ACCOUNTS
+    root = tk_root()
+    results = {}
+
+    for n in courses:
+        fake.pages = pages = synthetic_pages(n, padding_kb=args.padding_kb)
+        repeat = max(3, args.repeat // max(1, n // 50))
+        results[f"fetch/{n}"] = bench_fetch(n, repeat)
+        results[f"parse/{n}"] = bench_parse(pages, repeat)
+        results[f"marks/{n}"] = bench_marks(pages, repeat)
+        if root is not None:
+            results[f"ui/{n}"] = bench_ui(root, pages, repeat)
+        print(f"  {n} courses done", file=sys.stderr)
+
+    fake.pages = synthetic_pages(8, padding_kb=args.padding_kb)
+    for a in accounts:
+        results[f"batch/{a}x8"] = bench_batch(a, 3)
+        if args.browser:
+            results[f"login/{a}"] = bench_login(a)
+    if root is None:
+        print("  (no display: ui/* scenarios skipped)", file=sys.stderr)
+    else:
+        root.destroy()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print every scenario against its baseline and return the names that regressed"""
+    regressions = []
+    print(f"{'scenario':<16}{'seconds':>10}{'baseline':>10}{'change':>9}")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<16}{seconds:>10.4f}{'-':>10}{'':>9}")
+            continue
+        change = seconds / before - 1 if before else 0.0
+        regressed = change > tolerance and seconds - before > MIN_REGRESSION
+        print(f"{name:<16}{seconds:>10.4f}{before:>10.4f}{change:>+8.0%}" + ("  REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller scales, for a fast check")
+    parser.add_argument("--repeat", type=int, default=9, help="runs per scenario (fewer at large scales)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, e.g. 0.25")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--browser", action="store_true", help="also benchmark real browser logins (needs Chrome)")
+    parser.add_argument("--padding-kb", type=int, default=8, help="view-state padding per page, in KB")
+    args = parser.parse_args()
+
+    start_portal(args.padding_kb)
+    try:
+        results = run(args)
+    finally:
+        fake.stop()
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **{name: round(seconds, 6) for name, seconds in results.items()}}, f, indent=1)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif not baseline:
+        print("\nNo baseline yet; run with --save-baseline to store one.")
+    if regressions and not args.save_baseline:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Startup benchmark: how long importing the GUI module takes, and what it drags in.
+
+    python benchmarks/bench_import.py [-n RUNS] [--budget SECONDS] [-v]
+
+Each run imports "CUIMS gui.py" in a fresh interpreter (the __main__ guard keeps the window
+from opening). The median must stay under the budget, and none of the heavy dependencies
+may be loaded by the import itself; they belong to the background loader. Either failure
+exits with status 1. -v prints python -X importtime output for one run, slowest first.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_FILE = os.path.join(ROOT, "CUIMS gui.py")
+HEAVY_MODULES = ("pandas", "numpy", "selenium", "webdriver_manager", "bs4", "lxml", "PIL", "requests",
+                 "cryptography")
+
+IMPORT_GUI = f"""
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("cuims_gui", {GUI_FILE!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def import_once(extra_args=()):
+    return subprocess.run([sys.executable, *extra_args, "-c", IMPORT_GUI], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--runs", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=0.3, help="maximum median import time in seconds")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the slowest imports")
+    args = parser.parse_args()
+
+    runs = [json.loads(import_once().stdout) for _ in range(args.runs)]
+    median = statistics.median(run["seconds"] for run in runs)
+    heavy = runs[-1]["heavy"]
+    print(f"import 'CUIMS gui.py': median {median * 1000:.0f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+    if heavy:
+        print(f"loaded at import time: {', '.join(heavy)}")
+
+    if args.verbose:
+        rows = []
+        for line in import_once(["-X", "importtime"]).stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                rows.append((int(parts[1]), parts[2].rstrip()))
+        print(f"\n{'cumulative ms':>14}  module")
+        for cumulative, module in sorted(rows, reverse=True)[:25]:
+            print(f"{cumulative / 1000:>14.1f}  {module}")
+
+    if median > args.budget or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Parse-throughput benchmark for parsers.py against the saved page fixtures.
+
+Before timing, every parser is checked for parity with the original full-tree
+html.parser implementation; a mismatch exits with status 1.
+
+    python benchmarks/bench_parsing.py [-n ITERATIONS] [-j WORKERS]
+
+With -j, the mixed stream of all fixtures is also pushed through parse_pipeline on
+1..WORKERS processes to show how bulk parsing scales with cores.
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import parse_pipeline  # noqa: E402
+import parsers  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_attendance(html):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", {"id": "SortTable"})
+    if not table:
+        return None
+    headers = [th.text.strip() for th in table.find_all("th")]
+    rows = [[td.text.strip() for td in tr.find_all("td")[:-1]] for tr in table.find("tbody").find_all("tr")]
+    return headers[:-1], rows
+
+
+def legacy_marks(html):
+    soup = BeautifulSoup(html, "html.parser")
+    all_data = []
+    for div in soup.select(".ui-accordion-content"):
+        course = div.find_previous("h3").get_text(strip=True)
+        table = div.find("table")
+        if not table: continue
+        headers = [th.get_text(strip=True) for th in table.find_all("th")]
+        for row in table.find("tbody").find_all("tr"):
+            cells = [td.get_text(strip=True) for td in row.find_all("td")]
+            if len(cells) == len(headers):
+                record = dict(zip(headers, cells))
+                record["Course"] = course
+                all_data.append(record)
+    return all_data
+
+
+def legacy_timetable(html):
+    soup = BeautifulSoup(html, "html.parser")
+    course_table_html = soup.find("table", {"id": "ContentPlaceHolder1_grdCourseDetail"})
+    course_mapping = {}
+    if course_table_html:
+        for row in course_table_html.find_all("tr")[1:]:
+            cols = [td.get_text(strip=True) for td in row.find_all("td")]
+            if len(cols) >= 2:
+                course_mapping[cols[0].strip()] = cols[1].strip()
+    timetable = soup.find("table", {"id": "ContentPlaceHolder1_grdMain"})
+    if not timetable:
+        return None
+    headers = [th.get_text(strip=True) for th in timetable.find("tr").find_all("th")]
+    rows = []
+    for tr in timetable.find_all("tr")[1:]:
+        cols = [td.get_text(strip=True) for td in tr.find_all("td")]
+        if not cols:
+            continue
+        processed_cols = []
+        for col in cols:
+            # First-match substitution; parsers.py agrees with it on cells holding a single code
+            found_code = None
+            for code in course_mapping:
+                if code in col:
+                    found_code = code
+                    break
+            processed_cols.append(col.replace(found_code, course_mapping[found_code]) if found_code else col)
+        rows.append(processed_cols)
+    return headers, rows
+
+
+CASES = [
+    ("attendance", legacy_attendance, parsers.parse_attendance),
+    ("marks", legacy_marks, parsers.parse_marks),
+    ("timetable", legacy_timetable, lambda html: parsers.parse_timetable(html)[:2]),
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name + ".html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def check_parity():
+    ok = True
+    for name, legacy, current in CASES:
+        html = load_fixture(name)
+        if legacy(html) != current(html):
+            print(f"PARITY FAIL  {name}: parsers.py output differs from the html.parser reference")
+            ok = False
+        else:
+            print(f"parity ok    {name}")
+    # A plain HTTP GET returns the accordion before jQuery UI has restyled it
+    if parsers.parse_marks(load_fixture("marks_raw")) != parsers.parse_marks(load_fixture("marks")):
+        print("PARITY FAIL  marks_raw: server markup parses differently from the browser's")
+        ok = False
+    else:
+        print("parity ok    marks_raw")
+    return ok
+
+
+def throughput(func, html, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(html)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, len(html) * iterations / elapsed / 1e6
+
+
+def pipeline_throughput(workers, iterations):
+    pages = [(None, name, load_fixture(name)) for name, _, _ in CASES] * iterations
+    executor = parse_pipeline.process_pool(workers)
+    try:
+        # Spawned workers import bs4 and lxml on their first page; keep that out of the timing
+        list(parse_pipeline.parse_stream(pages[:workers * 2], workers, executor=executor))
+        start = time.perf_counter()
+        for result in parse_pipeline.parse_stream(pages, workers, executor=executor):
+            if result.table is None:
+                raise SystemExit(f"pipeline failed to parse {result.page}: {result.error}")
+        return len(pages) / (time.perf_counter() - start)
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("-j", "--workers", type=int, default=0, help="also benchmark the process-pool pipeline")
+    args = parser.parse_args()
+
+    if not check_parity():
+        sys.exit(1)
+
+    print(f"\n{'page':<12}{'reference p/s':>15}{'parsers p/s':>14}{'MB/s':>8}{'speedup':>9}")
+    for name, legacy, current in CASES:
+        html = load_fixture(name)
+        legacy_rate, _ = throughput(legacy, html, args.iterations)
+        rate, mb_rate = throughput(current, html, args.iterations)
+        print(f"{name:<12}{legacy_rate:>15.1f}{rate:>14.1f}{mb_rate:>8.2f}{rate / legacy_rate:>8.1f}x")
+
+    if args.workers:
+        serial = len(CASES) / sum(1 / throughput(current, load_fixture(name), args.iterations)[0]
+                                  for name, _, current in CASES)
+        print(f"\n{'workers':<12}{'pages/s':>15}{'scaling':>14}")
+        print(f"{'serial':<12}{serial:>15.1f}{1:>13.2f}x")
+        for workers in range(1, args.workers + 1):
+            rate = pipeline_throughput(workers, args.iterations)
+            print(f"{workers:<12}{rate:>15.1f}{rate / serial:>13.2f}x")
+
+
+if __name__ == "__main__":
+    main()
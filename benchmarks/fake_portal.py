@@ -0,0 +1,294 @@
+"""Local stand-in for the student portal: login flow and the three data pages, synthetic or recorded.
+
+    python benchmarks/fake_portal.py --port 8000 --courses 40 --latency 0.2 --failure-rate 0.05
+    CUIMS_PORTAL_URL=http://127.0.0.1:8000/ python "CUIMS gui.py"
+
+Any UID and password log in; the captcha answer must match --captcha unless that is empty.
+Pages are generated for --courses courses, or served from --recorded DIR (attendance.html,
+marks.html and timetable.html, e.g. benchmarks/fixtures).
+"""
+import argparse
+import base64
+import html
+import math
+import os
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+HOME_PATH = "StudentHome.aspx"
+LOGIN_PATH = "Login.aspx"
+PAGE_PATHS = {
+    "attendance": "frmStudentCourseWiseAttendanceSummary.aspx",
+    "marks": "frmStudentMarksView.aspx",
+    "timetable": "frmMyTimeTable.aspx",
+}
+# A 1x1 PNG stands in for the captcha image
+CAPTCHA_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+SUBJECTS = ("Algorithms", "Computer Networks", "Operating Systems", "Software Engineering", "Cloud Computing",
+            "Machine Learning", "Compiler Design", "Data Mining", "Computer Graphics", "Aptitude")
+REGULAR_COMPONENTS = (("Assignment", 10), ("Attendance Marks", 2), ("Surprise Test", 12), ("Quiz", 4),
+                      ("MST 1", 20), ("MST 2", 20))
+HYBRID_COMPONENTS = REGULAR_COMPONENTS + tuple((f"Worksheet {i}", 30) for i in range(1, 11)) + (
+    ("Lab MST", 10), ("End Sem Practical", 40))
+
+_PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head>
+<body><form method="post" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+<div class="content-wrapper" id="ContentPlaceHolder1_divContent">
+{body}
+</div></form></body></html>
+"""
+
+
+def _page(title, body, padding_kb):
+    # ASP.NET pages carry a large opaque view state; it dominates their size
+    viewstate = base64.b64encode(os.urandom(padding_kb * 768)).decode()
+    return _PAGE.format(title=title, body=body, viewstate=viewstate)
+
+
+def courses_for(count, seed=0):
+    rng = random.Random(seed)
+    return [(f"22CS{rng.choice('HPTRA')}-{300 + i}", f"{SUBJECTS[i % len(SUBJECTS)]} {i // len(SUBJECTS) + 1}")
+            for i in range(count)]
+
+
+def synthetic_pages(courses=8, seed=0, padding_kb=8):
+    """{page name: html} for a student with `courses` courses; every fourth course is hybrid"""
+    rng = random.Random(seed)
+    catalog = courses_for(courses, seed)
+
+    rows = []
+    for code, title in catalog:
+        delivered = rng.randint(30, 70)
+        attended = rng.randint(delivered // 2, delivered)
+        rows.append(f"<tr><td>{code}</td><td>{html.escape(title)}</td><td>{delivered}</td><td>{attended}</td>"
+                    f"<td>0</td><td>0</td><td>{attended / delivered * 100:.2f}</td>"
+                    f"<td><a href=\"javascript:void(0)\">View</a></td></tr>")
+    attendance = ('<table id="SortTable" class="table"><thead><tr><th>Course Code</th><th>Title</th>'
+                  "<th>Eligible Delivered</th><th>Eligible Attended</th><th>Duty Leave</th><th>Medical Leave</th>"
+                  "<th>Eligible Percentage</th><th>Report</th></tr></thead><tbody>\n"
+                  + "\n".join(rows) + "\n</tbody></table>")
+
+    sections = []
+    for i, (code, title) in enumerate(catalog):
+        components = HYBRID_COMPONENTS if i % 4 == 3 else REGULAR_COMPONENTS
+        marks = "".join(f"<tr><td>{name}</td><td>{maximum}</td><td>{rng.randint(maximum // 2, maximum * 2) / 2:.1f}</td></tr>"
+                        for name, maximum in components)
+        sections.append(f"<h3>{code} : {html.escape(title)}</h3>\n<div>"
+                        "<table class=\"table\"><thead><tr><th>Name</th><th>MaxMarks</th><th>Obtained</th></tr></thead>"
+                        f"<tbody>{marks}</tbody></table></div>")
+    # Markup as the server sends it; jQuery UI adds its accordion classes only in a browser
+    marks_page = '<div id="accordion">\n' + "\n".join(sections) + "\n</div>"
+
+    slots = max(8, math.ceil(courses * 4 / len(DAYS)))
+    grid = ["<tr><th>Timing</th>" + "".join(f"<th>{day}</th>" for day in DAYS) + "</tr>"]
+    for slot in range(slots):
+        start = 9 * 60 + 40 + slot * 40
+        cells = []
+        for _ in DAYS:
+            code, _title = rng.choice(catalog) if catalog else ("", "")
+            cells.append(f"<td>{code}:{rng.choice('LTP')}:: GP-All:By:E{rng.randint(10000, 19999)}"
+                         f"<br />Block {rng.randint(1, 8)} Room {rng.randint(100, 499)}</td>" if rng.random() < 0.8 else "<td></td>")
+        grid.append(f"<tr><td>{start // 60:02d}:{start % 60:02d} - {(start + 40) // 60:02d}:{(start + 40) % 60:02d}</td>"
+                    + "".join(cells) + "</tr>")
+    details = "".join(f"<tr><td>{code}</td><td>{html.escape(title)}</td><td>L</td><td>E1{i:04d}</td></tr>"
+                      for i, (code, title) in enumerate(catalog))
+    timetable = ('<table class="table" id="ContentPlaceHolder1_grdMain">\n' + "\n".join(grid) + "\n</table>\n"
+                 '<table class="table" id="ContentPlaceHolder1_grdCourseDetail">'
+                 "<tr><th>Course Code</th><th>Title</th><th>Type</th><th>Faculty</th></tr>" + details + "</table>")
+
+    return {
+        "attendance": _page("frmStudentCourseWiseAttendanceSummary.aspx", attendance, padding_kb),
+        "marks": _page("frmStudentMarksView.aspx", marks_page, padding_kb),
+        "timetable": _page("frmMyTimeTable.aspx", timetable, padding_kb),
+    }
+
+
+def recorded_pages(directory):
+    pages = {}
+    for name in PAGE_PATHS:
+        with open(os.path.join(directory, name + ".html"), encoding="utf-8") as f:
+            pages[name] = f.read()
+    return pages
+
+
+_LOGIN_UID = """<html><body><form method="post" action="{path}">
+<input type="hidden" name="step" value="uid" />
+<input type="text" id="txtUserId" name="txtUserId" />
+<input type="submit" id="btnNext" value="Next" />
+</form></body></html>"""
+
+_LOGIN_PASSWORD = """<html><body><form method="post" action="{path}">
+<input type="hidden" name="step" value="password" />
+<input type="hidden" name="txtUserId" value="{uid}" />
+<input type="password" id="txtLoginPassword" name="txtLoginPassword" />
+<img id="imgCaptcha" src="GenerateCaptcha.aspx" />
+<input type="text" id="txtcaptcha" name="txtcaptcha" />
+<input type="submit" id="btnLogin" value="Login" />
+</form></body></html>"""
+
+
+class FakePortal:
+    """Threaded HTTP server imitating the portal.
+
+    Without recorded pages, pages for `courses` courses are generated, each padded with about
+    padding_kb of view state. latency (+/- jitter) seconds are added to every response;
+    failure_rate of data-page requests get a 500; sessions older than session_ttl seconds are
+    sent back to the login page.
+    """
+
+    def __init__(self, pages=None, courses=8, latency=0.0, jitter=0.0, failure_rate=0.0, session_ttl=None,
+                 captcha="", host="127.0.0.1", port=0, seed=0, padding_kb=8):
+        self.pages = pages or synthetic_pages(courses, seed, padding_kb)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.session_ttl = session_ttl
+        self.captcha = captcha
+        self.rng = random.Random(seed)
+        self.sessions = {} # session id -> (uid, created_at)
+        self.requests = {"login": 0, "page": 0, "failed": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-portal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def new_session(self, uid="fake"):
+        """Create a logged-in session directly and return its cookie, skipping the login form"""
+        session_id = secrets.token_hex(12)
+        with self._lock:
+            self.sessions[session_id] = (uid, time.monotonic())
+        return {"name": SESSION_COOKIE, "value": session_id, "path": "/",
+                "domain": self.server.server_address[0]}
+
+    def _session_valid(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session and self.session_ttl is not None and time.monotonic() - session[1] > self.session_ttl:
+                del self.sessions[session_id]
+                self.requests["expired"] += 1
+                session = None
+        return session is not None
+
+    def _delay(self):
+        delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _count(self, key):
+        with self._lock:
+            self.requests[key] += 1
+
+    def _handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+                if isinstance(body, str):
+                    body = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _redirect(self, path, headers=()):
+                self._send(302, headers=[("Location", "/" + path), *headers])
+
+            def _session_id(self):
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == SESSION_COOKIE:
+                        return value
+                return None
+
+            def do_GET(self):
+                portal._delay()
+                path = urlsplit(self.path).path.lstrip("/")
+                if path in ("", LOGIN_PATH):
+                    return self._send(200, _LOGIN_UID.format(path=LOGIN_PATH))
+                if path == "GenerateCaptcha.aspx":
+                    return self._send(200, CAPTCHA_PNG, "image/png", [("Cache-Control", "no-store")])
+                if not portal._session_valid(self._session_id()):
+                    return self._redirect(LOGIN_PATH)
+                if path == HOME_PATH:
+                    return self._send(200, "<html><body><h2>Welcome</h2></body></html>")
+                for name, page_path in PAGE_PATHS.items():
+                    if path == page_path:
+                        portal._count("page")
+                        if portal.failure_rate and portal.rng.random() < portal.failure_rate:
+                            portal._count("failed")
+                            return self._send(500, "<html><body>Server Error in '/' Application.</body></html>")
+                        return self._send(200, portal.pages[name])
+                self._send(404, "Not found")
+
+            def do_POST(self):
+                portal._delay()
+                length = int(self.headers.get("Content-Length") or 0)
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                if form.get("step") == "uid":
+                    return self._send(200, _LOGIN_PASSWORD.format(path=LOGIN_PATH, uid=html.escape(form.get("txtUserId", ""))))
+                if portal.captcha and form.get("txtcaptcha") != portal.captcha:
+                    return self._send(200, _LOGIN_UID.format(path=LOGIN_PATH))
+                portal._count("login")
+                cookie = portal.new_session(form.get("txtUserId", ""))
+                self._redirect(HOME_PATH, [("Set-Cookie", f"{SESSION_COOKIE}={cookie['value']}; Path=/; HttpOnly")])
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake student portal locally.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--padding-kb", type=int, default=8, help="view-state padding per generated page, in KB")
+    parser.add_argument("--recorded", help="directory of recorded attendance/marks/timetable .html pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of data-page requests answered with 500")
+    parser.add_argument("--session-ttl", type=float, help="seconds before a session is sent back to the login page")
+    parser.add_argument("--captcha", default="", help="required captcha answer (default: accept anything)")
+    args = parser.parse_args()
+
+    portal = FakePortal(recorded_pages(args.recorded) if args.recorded else None, args.courses, args.latency,
+                        args.jitter, args.failure_rate, args.session_ttl, args.captcha, port=args.port,
+                        padding_kb=args.padding_kb).start()
+    print(f"Fake portal on {portal.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Watch-mode scenarios: the Watcher re-fetching pages from the fake portal on a simulated clock.
+
+    python benchmarks/watch_scenarios.py [--rounds 40] [--failure-rate 0.3] [--seed 0]
+
+The watcher's clock and rng are replaced, so hours of watching take a few seconds and
+every wait can be checked exactly. The fetches themselves are real: a PortalClient resumes a
+session on the fake portal and goes through load, content hash and parse as in the app.
+
+    changes     nothing changes between identical fetches; swapping fake.pages shows up as a
+                change of exactly the pages that were swapped
+    backoff     with failure_rate of page requests failing, every wait is interval * 2**failures
+                (capped at max_backoff) and a success resets it
+    slow        fetches slower than slow_after back off like failures
+
+Any check that fails is printed and the exit status is 1.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from fake_portal import FakePortal, synthetic_pages  # noqa: E402
+
+PAGES = ("attendance", "marks", "timetable")
+MAX_BACKOFF = 4 * 60 * 60
+
+fake = None # The FakePortal, started by start_portal()
+failures = [] # Messages of the checks that failed
+
+
+class Clock:
+    """A monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def start_portal():
+    """Start the fake portal, then import the app's modules pointed at it (see bench_e2e.start_portal)"""
+    global fake, engine, watcher, SavedSession
+    fake = FakePortal().start()
+    os.environ["CUIMS_PORTAL_URL"] = fake.url
+    os.environ["CUIMS_CACHE_DIR"] = tempfile.mkdtemp(prefix="cuims-watch-")
+    os.environ["CUIMS_METRICS_FILE"] = ""
+
+    import engine
+    import watcher
+    from session_store import SavedSession
+
+
+def expect(condition, message):
+    if not condition:
+        failures.append(message)
+        print(f"  FAIL {message}")
+
+
+def resumed_client():
+    client = engine.PortalClient(log=lambda message, level=None, exc_info=False: None)
+    if not client.resume(SavedSession([fake.new_session("WATCH")], "watch")):
+        raise SystemExit("could not resume a session on the fake portal")
+    return client
+
+
+def new_watcher(client, clock, seed, fetch=None, pages=PAGES, **kwargs):
+    errors = []
+    fetch = fetch or client.fetch_table
+    w = watcher.Watcher({page: (lambda page=page: fetch(page)) for page in pages}, clock=clock,
+                        rng=random.Random(seed), max_backoff=MAX_BACKOFF,
+                        on_error=lambda name, e: errors.append(name), **kwargs)
+    return w, errors
+
+
+def step(w, clock):
+    """Move the clock to the next due page and run everything due then"""
+    clock.advance(w.due_in())
+    return w.run_pending()
+
+
+def run_round(w, clock):
+    """Step until every page has run at least once; returns the names that changed"""
+    pending = {s.name for s in w.schedules}
+    changed = []
+    while pending:
+        last_due = {s.name: s.next_due for s in w.schedules}
+        changed += step(w, clock)
+        pending -= {s.name for s in w.schedules if s.next_due != last_due[s.name]}
+    return changed
+
+
+def scenario_changes(seed):
+    print("changes")
+    fake.pages = synthetic_pages(seed=seed)
+    clock = Clock()
+    client = resumed_client()
+    w, errors = new_watcher(client, clock, seed)
+
+    changed = run_round(w, clock)
+    expect(sorted(changed) == sorted(PAGES), f"first fetch should report every page, got {changed}")
+    changed = run_round(w, clock)
+    expect(changed == [], f"identical pages should report no change, got {changed}")
+
+    # Regenerated pages get fresh view state; only the data decides what counts as a change
+    fake.pages = synthetic_pages(seed=seed)
+    changed = run_round(w, clock)
+    expect(changed == [], f"new view state alone should not count as a change, got {changed}")
+
+    fake.pages = {**fake.pages, "marks": synthetic_pages(seed=seed + 1)["marks"]}
+    changed = run_round(w, clock)
+    expect(changed == ["marks"], f"swapping the marks page should change only marks, got {changed}")
+
+    fake.pages = synthetic_pages(courses=9, seed=seed)
+    changed = run_round(w, clock)
+    expect(sorted(changed) == sorted(PAGES), f"an added course should change every page, got {changed}")
+    expect(errors == [], f"no fetch should fail, got {errors}")
+    client.close()
+
+
+def check_waits(w, clock, last_due):
+    """Every page that just ran must be rescheduled interval * 2**failures (capped) from now"""
+    for s in w.schedules:
+        if s.next_due == last_due[s.name]:
+            continue
+        expected = min(s.interval * 2 ** s.failures, w.max_backoff)
+        expect(abs(s.next_due - clock() - expected) < 1e-6,
+               f"{s.name} after {s.failures} failures waits {s.next_due - clock():.0f}s, expected {expected:.0f}s")
+
+
+def scenario_backoff(rounds, failure_rate, seed):
+    print(f"backoff (failure rate {failure_rate:g})")
+    clock = Clock()
+    client = resumed_client()
+    w, errors = new_watcher(client, clock, seed, jitter=0)
+    fake.pages = synthetic_pages(seed=seed)
+    fake.rng = random.Random(seed)
+    fake.failure_rate = failure_rate
+    streaks = dict.fromkeys(PAGES, 0)
+    longest = dict.fromkeys(PAGES, 0)
+    try:
+        for _ in range(rounds):
+            last_due = {s.name: s.next_due for s in w.schedules}
+            before = len(errors)
+            step(w, clock)
+            for s in w.schedules:
+                if s.next_due == last_due[s.name]:
+                    continue
+                streaks[s.name] = streaks[s.name] + 1 if s.name in errors[before:] else 0
+                longest[s.name] = max(longest[s.name], streaks[s.name])
+                expect(s.failures == streaks[s.name],
+                       f"{s.name} counts {s.failures} failures in a row, the portal answered {streaks[s.name]}")
+            check_waits(w, clock, last_due)
+    finally:
+        fake.failure_rate = 0.0
+    print(f"  {len(errors)} failed fetches in {rounds} steps; longest streak per page: {longest}")
+
+    run_round(w, clock)
+    expect(all(s.failures == 0 for s in w.schedules), "a successful fetch should reset the backoff")
+    client.close()
+
+
+def scenario_slow(seed):
+    print("slow")
+    clock = Clock()
+    client = resumed_client()
+
+    def slow_fetch(page):
+        clock.advance(w.slow_after + 1)
+        return client.fetch_table(page)
+
+    # One page, so the time a fetch takes doesn't shift another page's schedule within the step
+    w, errors = new_watcher(client, clock, seed, fetch=slow_fetch, pages=("marks",), jitter=0)
+    for expected in range(1, 6):
+        last_due = {s.name: s.next_due for s in w.schedules}
+        step(w, clock)
+        expect(w.schedules[0].failures == expected,
+               f"after {expected} slow fetches marks counts {w.schedules[0].failures} failures")
+        check_waits(w, clock, last_due)
+    expect(errors == [], f"slow fetches should still succeed, got {errors}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=40, help="watcher steps in the backoff scenario")
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start_portal()
+    try:
+        scenario_changes(args.seed)
+        scenario_backoff(args.rounds, args.failure_rate, args.seed)
+        scenario_backoff(args.rounds // 4, 1.0, args.seed)
+        scenario_slow(args.seed)
+    finally:
+        fake.stop()
+    print("all watch scenarios passed" if not failures else f"{len(failures)} checks failed")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
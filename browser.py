@@ -0,0 +1,225 @@
+"""Headless Chrome setup: cached driver resolution and a pre-warmed login browser."""
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+
+import portal
+from metrics import span
+from portal import CACHE_DIR
+
+DRIVER_CACHE_FILE = os.path.join(CACHE_DIR, "chromedriver.json")
+
+# A warm login page older than this is reloaded before use, as its form state may have expired
+WARM_MAX_AGE = 10 * 60
+
+# Only page_source and the captcha are ever read, so skip everything that is purely visual
+LEAN_BROWSER = os.environ.get("CUIMS_LEAN_BROWSER", "1") != "0"
+IMAGE_URL_PATTERNS = ["*.jpg", "*.jpeg", "*.gif", "*.png", "*.svg", "*.webp", "*.ico"]
+ASSET_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+]
+LEAN_ARGUMENTS = [
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-extensions",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+]
+LEAN_PREFS = {
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+    "profile.managed_default_content_settings.plugins": 2,
+    "profile.managed_default_content_settings.popups": 2,
+    "credentials_enable_service": False,
+    "profile.password_manager_enabled": False,
+}
+
+_driver_lock = threading.Lock()
+
+
+def chrome_options(lean=LEAN_BROWSER):
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    if lean:
+        for argument in LEAN_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        chrome_options.add_experimental_option("prefs", LEAN_PREFS)
+    return chrome_options
+
+
+def installed_chrome_version():
+    try:
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        return None
+
+
+def chromedriver_path():
+    """Return a ChromeDriver binary, only asking webdriver_manager when Chrome has changed version"""
+    with _driver_lock, span("driver.install"):
+        chrome_version = installed_chrome_version()
+        try:
+            with open(DRIVER_CACHE_FILE) as f:
+                cached = json.load(f)
+            if chrome_version and cached["chrome_version"] == chrome_version and os.path.isfile(cached["path"]):
+                return cached["path"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        path = ChromeDriverManager().install()
+        if chrome_version:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(DRIVER_CACHE_FILE, "w") as f:
+                json.dump({"chrome_version": chrome_version, "path": path}, f)
+        return path
+
+
+def launch_browser(lean=LEAN_BROWSER):
+    service = Service(chromedriver_path())
+    with span("browser.launch"):
+        driver = webdriver.Chrome(service=service, options=chrome_options(lean))
+    if lean:
+        # Request blocking goes through DevTools so the captcha image can still be let through
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": IMAGE_URL_PATTERNS + ASSET_URL_PATTERNS})
+        _lean_drivers.add(driver)
+    return driver
+
+
+_CAPTCHA_LOADED = "return arguments[0].complete && arguments[0].naturalWidth > 0;"
+_lean_drivers = weakref.WeakSet() # Drivers launched with images blocked
+
+
+@contextmanager
+def _captcha_images(driver):
+    """Let images through while a captcha loads, then block them again so a reused browser stays lean"""
+    if driver not in _lean_drivers:
+        yield
+        return
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": ASSET_URL_PATTERNS})
+    try:
+        yield
+    finally:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": IMAGE_URL_PATTERNS + ASSET_URL_PATTERNS})
+
+
+def ensure_captcha_loaded(driver, captcha_element, timeout=10):
+    """Lift image blocking and reload the captcha if the lean profile stopped it from loading"""
+    if driver.execute_script(_CAPTCHA_LOADED, captcha_element):
+        return
+    # A fresh src makes the portal issue a new captcha, which is fine as none has been shown yet
+    reload_captcha(driver, captcha_element, timeout)
+
+
+def reload_captcha(driver, captcha_element, timeout=10):
+    """Have the portal issue a new captcha and return its image as PNG bytes"""
+    with _captcha_images(driver):
+        driver.execute_script(
+            "var img = arguments[0]; img.src = img.src.replace(/([?&])_=\\d+$/, '') "
+            "+ (img.src.indexOf('?') < 0 ? '?' : '&') + '_=' + Date.now();",
+            captcha_element)
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script(_CAPTCHA_LOADED, captcha_element))
+        return captcha_element.screenshot_as_png
+
+
+def open_login_page(driver, timeout=30):
+    driver.get(portal.BASE_URL)
+    WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.ID, "txtUserId")))
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class WarmBrowser:
+    """Launches a browser in the background and parks it on the portal login page"""
+
+    def __init__(self):
+        self.driver = None
+        self.error = None
+        self.ready_at = None
+        self._ready = threading.Event()
+        self._taken = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._warm, name="warm-browser", daemon=True)
+        self._thread.start()
+        return self
+
+    def _warm(self):
+        driver = None
+        try:
+            driver = launch_browser()
+            open_login_page(driver)
+        except Exception as e:
+            self.error = e
+            if driver is not None:
+                # A browser that never reached the login page would be mistaken for a ready one
+                _quit_quietly(driver)
+                driver = None
+        with self._lock:
+            if self._taken and driver is not None:
+                # Nobody is waiting for this browser any more
+                driver.quit()
+            else:
+                self.driver = driver
+                self.ready_at = time.monotonic()
+        self._ready.set()
+
+    def _claim(self, timeout):
+        self._ready.wait(timeout)
+        with self._lock:
+            self._taken = True
+            driver, self.driver = self.driver, None
+        return driver
+
+    def take(self, timeout=None):
+        """Hand over the warm browser, or None if it failed or is not ready within timeout"""
+        driver = self._claim(timeout)
+        if driver is not None and time.monotonic() - self.ready_at > WARM_MAX_AGE:
+            try:
+                open_login_page(driver)
+            except Exception as e:
+                self.error = e
+                _quit_quietly(driver)
+                return None
+        return driver
+
+    def close(self, wait=False):
+        """Quit the browser; with wait, also wait for one still launching so it is quit rather than orphaned"""
+        driver = self._claim(timeout=0)
+        if driver is not None:
+            driver.quit()
+        if wait and self._thread is not None:
+            # Once claimed, a browser that comes up late is quit by _warm itself
+            self._thread.join()
@@ -0,0 +1,112 @@
+"""One queue for the captchas of every login in flight, answered by an operator or a solver callback."""
+import threading
+import time
+
+CAPTCHA_MAX_AGE = 120 # Seconds a captcha image is trusted before a fresh one is fetched
+
+
+class CaptchaRequest:
+    """A login waiting on the text of its captcha image"""
+
+    def __init__(self, uid, image, issued_at):
+        self.uid = uid
+        self.image = image
+        self.issued_at = issued_at
+        self.text = None
+        self._answered = threading.Event()
+
+    @property
+    def answered(self):
+        return self._answered.is_set()
+
+
+class CaptchaBroker:
+    """Logins call solve() from their own threads and each blocks on its own answer only.
+
+    Without a solver, requests queue up in arrival order for an operator, who reads them with
+    pending() and replies with answer(); on_change() is called from the posting thread whenever
+    the queue or an image changes. A solver(uid, png) callback answers directly instead and may
+    return None to hand that captcha to the operator.
+
+    An image left unanswered for max_age seconds is replaced by calling the login's refresh(),
+    so the answer is never typed against a captcha the portal has already expired.
+    """
+
+    def __init__(self, solver=None, max_age=CAPTCHA_MAX_AGE, on_change=None, clock=time.monotonic):
+        self.solver = solver
+        self.max_age = max_age
+        self.on_change = on_change
+        self.clock = clock
+        self._pending = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @classmethod
+    def wrap(cls, solve_captcha):
+        """Accept either a broker or a plain solve_captcha(uid, png) callable"""
+        return solve_captcha if isinstance(solve_captcha, cls) else cls(solver=solve_captcha)
+
+    def __call__(self, uid, image, refresh=None):
+        return self.solve(uid, image, refresh)
+
+    def solve(self, uid, image, refresh=None):
+        """Return the captcha text for uid; refresh() must return a new image of the same login's captcha"""
+        issued_at = self.clock()
+        if self.solver is not None:
+            text = self.solver(uid, image)
+            if text is not None and refresh is not None and self.clock() - issued_at > self.max_age:
+                # The answer came too late for this image; ask once more with a new one
+                image, issued_at = refresh(), self.clock()
+                text = self.solver(uid, image)
+            if text is not None:
+                return text
+
+        request = CaptchaRequest(uid, image, issued_at)
+        with self._lock:
+            if self._closed:
+                return ""
+            self._pending.append(request)
+        self._notify()
+        try:
+            while not request._answered.wait(self._time_left(request, refresh)):
+                request.image, request.issued_at = refresh(), self.clock()
+                self._notify()
+        finally:
+            self._remove(request)
+        return request.text
+
+    def _time_left(self, request, refresh):
+        if refresh is None:
+            return None
+        return max(0.0, request.issued_at + self.max_age - self.clock())
+
+    def pending(self):
+        """Unanswered requests, oldest first"""
+        with self._lock:
+            return list(self._pending)
+
+    def answer(self, request, text):
+        request.text = text
+        request._answered.set()
+        self._remove(request)
+
+    def close(self):
+        """Answer everything still waiting with an empty string and turn away new requests"""
+        with self._lock:
+            self._closed = True
+            requests, self._pending = self._pending, []
+        for request in requests:
+            request.text = ""
+            request._answered.set()
+        self._notify()
+
+    def _remove(self, request):
+        with self._lock:
+            if request not in self._pending:
+                return
+            self._pending.remove(request)
+        self._notify()
+
+    def _notify(self):
+        if self.on_change:
+            self.on_change()
@@ -0,0 +1,78 @@
+"""A single reusable window for answering queued captchas one after another."""
+import io
+import tkinter as tk
+from tkinter import ttk
+
+
+class CaptchaWindow:
+    """Shows the oldest captcha waiting in a CaptchaBroker and hides itself when none are left.
+
+    refresh() must run on the Tk thread; call it whenever the broker reports a change.
+    """
+
+    def __init__(self, master, broker):
+        self.master = master
+        self.broker = broker
+        self.request = None # The request on screen
+        self._image = None # Image object currently shown, to spot a refreshed captcha
+        self.window = None
+
+    def _build(self):
+        self.window = tk.Toplevel(self.master)
+        self.window.title("Enter Captcha")
+        self.window.geometry("300x230")
+        self.window.attributes("-topmost", True)
+        self.window.protocol("WM_DELETE_WINDOW", self.skip)
+
+        self.uid_label = ttk.Label(self.window)
+        self.uid_label.pack(pady=(5, 0))
+        self.image_label = ttk.Label(self.window)
+        self.image_label.pack(pady=5)
+        ttk.Label(self.window, text="Please enter the captcha:").pack(pady=5)
+        self.captcha_var = tk.StringVar()
+        self.entry = ttk.Entry(self.window, textvariable=self.captcha_var, justify="center")
+        self.entry.pack(pady=5)
+
+        buttons = ttk.Frame(self.window)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Submit", command=self.submit).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Skip", command=self.skip).pack(side="left", padx=5)
+        self.queue_label = ttk.Label(self.window)
+        self.queue_label.pack()
+        self.window.bind("<Return>", self.submit)
+
+    def refresh(self):
+        pending = self.broker.pending()
+        if not pending:
+            self.request = self._image = None
+            if self.window is not None:
+                self.window.withdraw()
+            return
+        if self.window is None:
+            self._build()
+
+        request = pending[0] if self.request not in pending else self.request
+        if request is not self.request or request.image is not self._image:
+            from PIL import Image, ImageTk # Only needed once a captcha shows up
+
+            self.request, self._image = request, request.image
+            photo = ImageTk.PhotoImage(Image.open(io.BytesIO(request.image)))
+            self.image_label.configure(image=photo)
+            self.image_label.image = photo
+            self.uid_label.configure(text=f"UID: {request.uid}")
+            self.captcha_var.set("")
+        waiting = len(pending) - 1
+        self.queue_label.configure(text=f"{waiting} more waiting" if waiting else "")
+        self.window.deiconify()
+        self.entry.focus_set()
+
+    def submit(self, event=None):
+        if self.request is not None:
+            self.broker.answer(self.request, self.captcha_var.get().strip())
+        self.refresh()
+
+    def skip(self):
+        """Give up on the captcha on screen; its login fails and the next one is shown"""
+        if self.request is not None:
+            self.broker.answer(self.request, "")
+        self.refresh()
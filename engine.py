@@ -0,0 +1,390 @@
+"""GUI-free portal engine: login, page fetching and multi-account batch runs."""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import browser
+import parse_pipeline
+import parsers
+import portal
+from activity_log import logger
+from captcha_broker import CaptchaBroker
+from metrics import span
+from portal import PortalHTTPSession, SessionExpiredError
+from records import Table
+from session_store import SavedSession, SessionStore
+
+PAGES = {
+    "attendance": portal.ATTENDANCE_PAGE,
+    "marks": portal.MARKS_PAGE,
+    "timetable": portal.TIMETABLE_PAGE,
+}
+LOGIN_TIMEOUT = 30
+NAVIGATION_TIMEOUT = 60 # Longest a single driver.get may block when the account has time to spare
+ACCOUNT_TIMEOUT = 300 # Per-account budget in a batch, not counting time spent waiting for a captcha answer
+
+
+class AccountTimeout(Exception):
+    """Raised when an account runs past its deadline"""
+
+
+class PortalClient:
+    """One account's portal session: a browser for the captcha login, then pooled HTTP for the data pages.
+
+    solve_captcha is a CaptchaBroker or a plain solve_captcha(uid, png_bytes) callable returning the
+    captcha text; log(message, level=logging.INFO, exc_info=False) receives progress messages.
+    parse(name, html) turns a page into a parsers.PageTable, e.g. a parse_pipeline.ProcessParser
+    to take parsing off this process.
+    """
+
+    def __init__(self, use_http=True, page_timeout=portal.PAGE_TIMEOUT,
+                 page_poll_interval=portal.PAGE_POLL_INTERVAL, log=None, deadline=None, parse=parsers.parse_table):
+        self.use_http = use_http
+        self.parse = parse
+        self.page_timeout = page_timeout
+        self.page_poll_interval = page_poll_interval
+        self.log = log or (lambda message, level=logging.INFO, exc_info=False:
+                           logger.log(level, message, exc_info=exc_info))
+        self.deadline = deadline # time.monotonic() value after which AccountTimeout is raised
+        self.driver = None
+        self.http = None # Pooled HTTP session built from the browser cookies after login
+        self.driver_lock = threading.Lock() # The browser can only navigate one page at a time
+        self.page_hashes = {} # Page name -> content_hash at its last successful parse; clear it on account change
+
+    def timed_out(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _remaining(self, limit):
+        """Clamp a wait to the time left before the deadline"""
+        if self.deadline is None:
+            return limit
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise AccountTimeout("Account ran out of time")
+        return min(limit, remaining)
+
+    def _navigate(self, url):
+        """driver.get, cut short at the deadline instead of the browser's five-minute page-load default"""
+        # Pooled browsers keep the timeout between accounts, so it is set again before every load
+        self.driver.set_page_load_timeout(self._remaining(NAVIGATION_TIMEOUT))
+        self.driver.get(url)
+
+    def resume(self, saved):
+        """Reuse a stored session if the portal still accepts it, skipping the browser and captcha"""
+        if saved.is_stale():
+            self.log("Saved session has expired, logging in again...")
+            return False
+        http = PortalHTTPSession.from_saved(saved, timeout=self._remaining(portal.HTTP_TIMEOUT))
+        with span("session.check"):
+            authenticated = http.is_authenticated()
+        if not authenticated:
+            http.close()
+            if authenticated is None:
+                self.log("Could not check the saved session, logging in again...")
+                return False
+            saved.record_expiry()
+            self.log("Saved session was rejected by the portal, logging in again...")
+            return False
+        # Whatever this client held before may belong to another account; never fall back on it
+        self.close()
+        self.http = http
+        self.log("✅ Resumed saved session, no login needed.")
+        return True
+
+    def login(self, driver, uid, pwd, solve_captcha, on_login_page=False):
+        """Log in with driver, which becomes this client's browser"""
+        with self.driver_lock:
+            self._login(driver, uid, pwd, solve_captcha, on_login_page)
+
+    def _login(self, driver, uid, pwd, solve_captcha, on_login_page):
+        self.driver = driver
+        if not on_login_page:
+            with span("login.open"):
+                self._navigate(portal.BASE_URL)
+        wait = WebDriverWait(self.driver, self._remaining(LOGIN_TIMEOUT))
+
+        with span("login.uid"):
+            wait.until(EC.presence_of_element_located((By.ID, "txtUserId"))).send_keys(uid)
+            self.driver.find_element(By.ID, "btnNext").click()
+
+        with span("login.password"):
+            wait.until(EC.presence_of_element_located((By.ID, "txtLoginPassword"))).send_keys(pwd)
+            captcha_element = wait.until(EC.presence_of_element_located((By.ID, "imgCaptcha")))
+            browser.ensure_captcha_loaded(self.driver, captcha_element)
+            captcha_data = captcha_element.screenshot_as_png
+        asked_at = time.monotonic()
+        with span("captcha.wait"):
+            # Only this login's thread drives its browser, so an expired captcha is refreshed right here
+            captcha_text = CaptchaBroker.wrap(solve_captcha).solve(
+                uid, captcha_data, refresh=lambda: browser.reload_captcha(self.driver, captcha_element))
+        if self.deadline is not None:
+            # A person answering the captcha shouldn't eat into the account's budget
+            self.deadline += time.monotonic() - asked_at
+        with span("login.submit"):
+            self.driver.find_element(By.ID, "txtcaptcha").send_keys(captcha_text)
+            self.driver.find_element(By.ID, "btnLogin").click()
+            WebDriverWait(self.driver, self._remaining(LOGIN_TIMEOUT)).until(EC.url_contains(portal.HOME_PATH))
+        self.log("✅ Login successful!")
+
+        # Pull the data pages as plain HTML over a keep-alive session instead of rendering them
+        if self.use_http:
+            self.http = PortalHTTPSession.from_driver(self.driver)
+
+    def saved_session(self, previous=None):
+        """A SavedSession for the current HTTP cookies, carrying over the lifetime observed for previous"""
+        if self.http is None:
+            return None
+        return SavedSession(self.http.cookies(), self.http.user_agent,
+                            lifetime=previous.lifetime if previous else None)
+
+    def load_page(self, page):
+        """Return the HTML of a portal page, over HTTP when a session is available"""
+        http = self.http
+        if http is not None:
+            try:
+                http.timeout = self._remaining(portal.HTTP_TIMEOUT)
+                with span("page.load", page=page.name, via="http"):
+                    return http.get_page(page.path)
+            except SessionExpiredError as e:
+                self.log(f"⚠️ HTTP session rejected ({e}), falling back to the browser.")
+                self.http = None
+        if self.driver is None:
+            # Resumed sessions have no browser to fall back on
+            raise SessionExpiredError("Portal session expired, please log in again")
+        with self.driver_lock, span("page.load", page=page.name, via="browser"):
+            self._navigate(portal.BASE_URL + page.path)
+            self.wait_until_ready(page)
+            return self.driver.page_source
+
+    def wait_until_ready(self, page):
+        """Block until the page's ready selector matches, instead of sleeping a fixed time"""
+        timeout = self._remaining(self.page_timeout)
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.page_poll_interval).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, page.ready_selector)))
+        except TimeoutException:
+            # Parse whatever rendered; the caller reports the missing table itself
+            self.log(f"⚠️ {page.name.capitalize()} page not ready after {timeout:g}s.")
+
+    def fetch_table(self, name):
+        """records.Table of one data page, or None if its tables hash the same as at the last parse.
+
+        Raises if the page or its table is unavailable.
+        """
+        html = self.load_page(PAGES[name])
+        digest = parsers.content_hash(html, name)
+        if digest is not None and self.page_hashes.get(name) == digest:
+            return None
+        with span("parse", page=name):
+            table = self.parse(name, html)
+        if table is None:
+            raise ValueError(f"{name.capitalize()} table not found")
+        if name == "timetable":
+            self._log_course_mapping(table.course_mapping)
+        self.page_hashes[name] = digest
+        return Table(name, table.columns, table.rows)
+
+    def _log_course_mapping(self, course_mapping):
+        if course_mapping is None:
+            self.log("⚠️ Course detail table not found, timetable shows course codes")
+        elif logger.isEnabledFor(logging.DEBUG):
+            for code, title in course_mapping.items():
+                self.log(f"Mapping: {code} → {title}", level=logging.DEBUG)
+
+    def fetch_tables(self, names=tuple(PAGES)):
+        """Fetch pages concurrently; returns ({name: Table}, {name: error message}).
+
+        Pages that are unchanged since the last fetch are in neither.
+        """
+        tables, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="fetch") as pool:
+            futures = {name: pool.submit(self.fetch_table, name) for name in names}
+        for name, future in futures.items():
+            try:
+                table = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+                # The message shows in the activity log; the traceback goes to the log file
+                self.log(f"❌ Error fetching {name}: {e}", level=logging.ERROR, exc_info=True)
+            else:
+                if table is not None:
+                    tables[name] = table
+        return tables, errors
+
+    def release_driver(self):
+        """Detach and return the browser, e.g. to hand it back to a pool"""
+        driver, self.driver = self.driver, None
+        return driver
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+        driver = self.release_driver()
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+class BrowserPool:
+    """Up to `size` headless browsers, launched on demand and reused across accounts"""
+
+    def __init__(self, size, launch=browser.launch_browser):
+        self.launch = launch
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = self.launch()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def release(self, driver, healthy=True):
+        """Return a browser; its cookies are wiped so the next account starts logged out"""
+        try:
+            if healthy:
+                driver.delete_all_cookies()
+                self._idle.put(driver)
+            else:
+                self._discard(driver)
+        except Exception:
+            self._discard(driver)
+        finally:
+            self._slots.release()
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+@dataclass
+class AccountResult:
+    uid: str
+    status: str = "ok" # ok, partial (some pages failed), failed or timeout
+    resumed: bool = False # Saved session reused, no login
+    pages: dict = field(default_factory=dict) # name -> records.Table
+    errors: dict = field(default_factory=dict) # page name or "login" -> message
+    elapsed: float = 0.0
+
+    def to_dict(self):
+        result = {f.name: getattr(self, f.name) for f in fields(self)}
+        result["pages"] = {name: table.as_dict() for name, table in self.pages.items()}
+        result["errors"] = dict(self.errors)
+        return result
+
+
+def fetch_account(uid, pwd, pool, solve_captcha, use_http=True, session_store=None, timeout=ACCOUNT_TIMEOUT,
+                  parse=parsers.parse_table):
+    """Log in (or resume) one account and fetch all pages; never raises, failures go into the result"""
+    started = time.monotonic()
+    result = AccountResult(uid)
+    def log(message, level=logging.INFO, exc_info=False):
+        logger.log(level, f"[{uid}] {message}", exc_info=exc_info)
+
+    client = PortalClient(use_http, log=log, deadline=started + timeout,
+                          parse=parse)
+    healthy = True
+    try:
+        saved = session_store.load(uid, pwd) if session_store and use_http else None
+        result.resumed = bool(saved) and client.resume(saved)
+        if not result.resumed:
+            # Only accounts that really need a login take a browser from the pool
+            client.login(pool.acquire(), uid, pwd, solve_captcha)
+
+        result.pages, result.errors = client.fetch_tables()
+        if result.errors:
+            if client.timed_out():
+                result.status = "timeout"
+            else:
+                result.status = "partial" if result.pages else "failed"
+        if session_store and client.http is not None:
+            session_store.save(uid, pwd, client.saved_session(saved))
+    except Exception as e:
+        healthy = False
+        if isinstance(e, AccountTimeout) or client.timed_out():
+            # A WebDriverWait cut short by the deadline raises its own TimeoutException
+            result.status = "timeout"
+            message = str(e) if isinstance(e, AccountTimeout) else f"Account ran out of time ({type(e).__name__})"
+            result.errors["login" if not result.pages else "account"] = message
+        else:
+            result.status = "failed"
+            result.errors["login"] = str(e)
+    finally:
+        driver = client.release_driver()
+        if driver is not None:
+            pool.release(driver, healthy)
+        client.close()
+        result.elapsed = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_batch(accounts, solve_captcha, pool_size=2, use_http=True, timeout=ACCOUNT_TIMEOUT,
+              session_store=None, on_result=None, pool=None, parse_workers=0):
+    """Fetch every (uid, password) in accounts with at most pool_size in flight; results come back in input order.
+
+    With parse_workers, pages are parsed on that many worker processes instead of the fetch threads,
+    so parsing isn't serialized behind the GIL when many accounts are in flight.
+    """
+    own_pool = pool is None
+    pool = pool or BrowserPool(pool_size)
+    # Every login in the batch posts to the same broker and its single operator queue
+    solve_captcha = CaptchaBroker.wrap(solve_captcha)
+    session_store = session_store if session_store is not None else SessionStore()
+    parse_executor = parse_pipeline.process_pool(parse_workers) if parse_workers else None
+    parse = parse_pipeline.ProcessParser(parse_executor) if parse_executor else parsers.parse_table
+
+    def run(account):
+        uid, pwd = account
+        result = fetch_account(uid, pwd, pool, solve_captcha, use_http, session_store, timeout, parse)
+        if on_result:
+            try:
+                on_result(result)
+            except Exception:
+                # A failing callback must not cost the rest of the batch its results
+                logger.exception(f"[{uid}] Result callback failed")
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="account") as executor:
+            return list(executor.map(run, accounts))
+    finally:
+        if own_pool:
+            pool.close()
+        if parse_executor:
+            parse_executor.shutdown()
@@ -0,0 +1,159 @@
+"""Internal-marks formulas, applied to every course at once from the fetched marks components.
+
+The formulas take plain numbers or NumPy/pandas arrays alike, so the manual calculator, the
+all-courses summary and the what-if grids share one definition.
+"""
+import numpy as np
+import pandas as pd
+
+from records import MarksComponent
+
+# Formula input -> pattern matched against the portal's component name; first match wins,
+# so "Lab MST" is claimed before the plain MST patterns see it
+COMPONENT_PATTERNS = {
+    "labmst": r"lab\s*mst",
+    "end": r"end\s*sem|practical",
+    "worksheet": r"work\s*sheet|experiment",
+    "surprise_test": r"surprise",
+    "assignment": r"assign",
+    "attendance": r"attendance",
+    "quiz": r"quiz",
+    "mst_1": r"\bmst\s*-?\s*(?:1|i)\b",
+    "mst_2": r"\bmst\s*-?\s*(?:2|ii)\b",
+}
+COMPONENT_LABELS = {
+    "labmst": "Lab MST",
+    "end": "End Sem Practical",
+    "worksheet": "Worksheets",
+    "surprise_test": "Surprise Test",
+    "assignment": "Assignment",
+    "attendance": "Attendance",
+    "quiz": "Quiz",
+    "mst_1": "MST 1",
+    "mst_2": "MST 2",
+}
+HYBRID_ONLY = ("end", "labmst", "worksheet")
+# Full marks of each input, used when the portal doesn't list one and for best-case projections
+DEFAULT_MAX_MARKS = {
+    "assignment": 10,
+    "attendance": 2,
+    "surprise_test": 12,
+    "quiz": 4,
+    "mst_1": 20,
+    "mst_2": 20,
+    "end": 40,
+    "labmst": 10,
+    "worksheet": 30 * 10, # Ten worksheets out of 30 each
+}
+HYBRID_OUT_OF = 70
+NONHYBRID_OUT_OF = 40
+
+
+def nonhybrid_total(assignment, attendance, surprise_test, quiz, mst_1, mst_2):
+    s = (surprise_test / 12) * 4
+    m = (mst_1 + mst_2) / 2
+    return assignment + quiz + m + attendance + s
+
+
+def hybrid_total(assignment, attendance, surprise_test, quiz, mst_1, mst_2, end, labmst, worksheet_total):
+    s = (surprise_test / 12) * 4
+    n = (labmst / 10) * 15
+    worksheet = (worksheet_total / 300) * 45
+    m = (mst_1 + mst_2) / 2
+    return ((assignment + quiz + m + attendance + s + worksheet + end + n) / 140) * HYBRID_OUT_OF
+
+
+def components(marks):
+    """Course-indexed frames (obtained, max_marks) with one column per formula input.
+
+    marks is a sequence of records.MarksComponent. Components the portal hasn't published yet
+    are NaN in obtained; worksheets are summed.
+    """
+    inputs = list(COMPONENT_PATTERNS)
+    if not marks:
+        empty = pd.DataFrame(columns=inputs, dtype=float)
+        return empty, empty.copy()
+    df = pd.DataFrame(marks, columns=MarksComponent._fields)
+    courses = pd.unique(df["course"])
+
+    names = df["name"].astype(str).str.lower()
+    masks = [names.str.contains(pattern, regex=True) for pattern in COMPONENT_PATTERNS.values()]
+    df = df.assign(
+        input=np.select(masks, inputs, default=""),
+        obtained=df["obtained"].astype(float),
+        max=df["max_marks"].astype(float),
+    )
+    df = df[df["input"] != ""]
+    grouped = df.groupby(["course", "input"])
+    obtained_frame = grouped["obtained"].sum(min_count=1).unstack().reindex(index=courses, columns=inputs)
+    max_frame = grouped["max"].sum(min_count=1).unstack().reindex(index=courses, columns=inputs)
+    max_frame = max_frame.fillna(pd.Series(DEFAULT_MAX_MARKS)).astype(float)
+    return obtained_frame.astype(float), max_frame
+
+
+def _totals(values, hybrid):
+    """Internal marks for each row of a frame (or dict of arrays) of formula inputs"""
+    common = [values[key] for key in ("assignment", "attendance", "surprise_test", "quiz", "mst_1", "mst_2")]
+    return np.where(hybrid,
+                    hybrid_total(*common, values["end"], values["labmst"], values["worksheet"]),
+                    nonhybrid_total(*common))
+
+
+def summary(marks):
+    """One row per course: type, internal marks so far, best case if every missing component is full marks"""
+    obtained, max_marks = components(marks)
+    hybrid = obtained[list(HYBRID_ONLY)].notna().any(axis=1).to_numpy()
+    so_far = _totals(obtained.fillna(0), hybrid)
+    best = _totals(obtained.fillna(max_marks), hybrid)
+    missing = obtained.isna().to_numpy()
+    return pd.DataFrame({
+        "Course": obtained.index,
+        "Type": np.where(hybrid, "Hybrid", "Regular"),
+        "Internal": np.round(so_far, 2),
+        "Best case": np.round(best, 2),
+        "Out of": np.where(hybrid, HYBRID_OUT_OF, NONHYBRID_OUT_OF),
+        "Missing": [", ".join(COMPONENT_LABELS[key] for key, gap in zip(obtained.columns, gaps)
+                              if gap and (is_hybrid or key not in HYBRID_ONLY))
+                    for gaps, is_hybrid in zip(missing, hybrid)],
+    })
+
+
+def what_if(marks, mst_2=None, end=None):
+    """Internal marks of every course over a grid of MST 2 and end-sem scores, in one broadcast pass.
+
+    Returns a long frame (Course, MST 2, End Sem, Internal); End Sem is NaN for regular courses.
+    Components other than the two varied ones keep their fetched value, or 0 if missing.
+    """
+    obtained, _ = components(marks)
+    mst_2 = np.arange(0, DEFAULT_MAX_MARKS["mst_2"] + 1, 2, dtype=float) if mst_2 is None else np.asarray(mst_2, float)
+    end = np.arange(0, DEFAULT_MAX_MARKS["end"] + 1, 5, dtype=float) if end is None else np.asarray(end, float)
+    hybrid = obtained[list(HYBRID_ONLY)].notna().any(axis=1).to_numpy()
+
+    # Axes: course x MST 2 x end sem
+    base = obtained.fillna(0)
+    values = {key: base[key].to_numpy()[:, None, None] for key in COMPONENT_PATTERNS}
+    values["mst_2"] = mst_2[None, :, None]
+    values["end"] = end[None, None, :]
+    shape = (len(base), len(mst_2), len(end))
+    totals = np.broadcast_to(_totals(values, hybrid[:, None, None]), shape)
+
+    course_index, mst_index, end_index = np.indices(shape).reshape(3, -1)
+    frame = pd.DataFrame({
+        "Course": base.index.to_numpy()[course_index],
+        "MST 2": mst_2[mst_index],
+        "End Sem": np.where(hybrid[course_index], end[end_index], np.nan),
+        "Internal": np.round(totals.reshape(-1), 2),
+    })
+    # Regular courses don't depend on the end-sem axis; keep one row per MST 2 score
+    return frame.drop_duplicates(["Course", "MST 2", "End Sem"]).reset_index(drop=True)
+
+
+def what_if_grid(marks, course, **grid):
+    """what_if for one course pivoted to MST 2 rows and end-sem columns, as (columns, rows) for a table"""
+    frame = what_if(marks, **grid)
+    frame = frame[frame["Course"] == course]
+    if frame["End Sem"].isna().all():
+        return ["MST 2", "Internal"], [[f"{mst:g}", total] for mst, total in zip(frame["MST 2"], frame["Internal"])]
+    pivot = frame.pivot(index="MST 2", columns="End Sem", values="Internal")
+    return (["MST 2 \\ End Sem"] + [f"{value:g}" for value in pivot.columns],
+            [[f"{mst:g}"] + list(values) for mst, values in zip(pivot.index, pivot.values.tolist())])
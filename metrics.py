@@ -0,0 +1,228 @@
+"""Per-phase timing: spans around each step of a fetch, exported as JSON lines and Prometheus text.
+
+    with metrics.span("page.load", page="marks"):
+        ...
+
+Every span is appended to ~/.cuims/metrics/spans.jsonl as it finishes, so percentiles can be
+tracked across runs:
+
+    python metrics.py [spans.jsonl]
+
+CUIMS_METRICS_PORT serves the current process's metrics in Prometheus text format over HTTP,
+and CUIMS_PROFILE (a comma-separated list of phases, or *) runs those spans under cProfile
+with the stats written to ~/.cuims/metrics/profiles/.
+"""
+import argparse
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from portal import CACHE_DIR
+
+METRICS_DIR = os.path.join(CACHE_DIR, "metrics")
+SPANS_FILE = os.environ.get("CUIMS_METRICS_FILE", os.path.join(METRICS_DIR, "spans.jsonl"))
+PROMETHEUS_FILE = os.path.join(METRICS_DIR, "cuims.prom")
+PROFILE_DIR = os.path.join(METRICS_DIR, "profiles")
+SPANS_MAX_BYTES = 5 * 1024 * 1024 # spans.jsonl is moved to spans.jsonl.1 past this size
+SAMPLES_PER_SERIES = 2000 # Latest durations kept in memory per phase for percentiles
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+class Series:
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES_PER_SERIES)
+
+
+class Metrics:
+    """Thread-safe registry of span timings, keyed by phase and labels"""
+
+    def __init__(self, spans_file=SPANS_FILE, profile_phases=(), profile_dir=PROFILE_DIR):
+        self.spans_file = spans_file
+        self.profile_phases = set(profile_phases)
+        self.profile_dir = profile_dir
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.series = defaultdict(Series)
+        self._lock = threading.Lock()
+        self._pending = [] # Span events not yet appended to spans_file
+        self._write_lock = threading.Lock() # Held by the one thread currently appending
+        self._server = None
+
+    @contextmanager
+    def span(self, phase, **labels):
+        """Time the block; an exception counts as a failure and is re-raised"""
+        profiler = self._start_profile(phase)
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if profiler is not None:
+                self._stop_profile(profiler, phase)
+            self.record(phase, duration, ok, **labels)
+
+    def record(self, phase, duration, ok=True, **labels):
+        key = (phase, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self.series[key]
+            series.count += 1
+            series.failures += not ok
+            series.total += duration
+            series.samples.append(duration)
+            if self.spans_file:
+                self._pending.append({"run": self.run_id, "ts": round(time.time(), 3), "phase": phase, **labels,
+                                      "seconds": round(duration, 6), "ok": ok})
+        self.flush()
+
+    def flush(self):
+        """Append pending span events to spans_file, outside the registry lock.
+
+        Only one thread writes at a time; the others leave their events to it rather than wait,
+        and the writer keeps going until nothing is pending.
+        """
+        while self._pending and self._write_lock.acquire(blocking=False):
+            try:
+                with self._lock:
+                    events, self._pending = self._pending, []
+                self._append(events)
+            finally:
+                self._write_lock.release()
+
+    def _append(self, events):
+        path = self.spans_file
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > SPANS_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(event) + "\n" for event in events))
+        except OSError:
+            self.spans_file = None # Metrics must never break a fetch; stop trying after the first failure
+
+    def _start_profile(self, phase):
+        if not (phase in self.profile_phases or "*" in self.profile_phases):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None # Another span already holds the profiler
+        return profiler
+
+    def _stop_profile(self, profiler, phase):
+        profiler.disable()
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.profile_dir, f"{phase}-{time.time():.3f}.prof"))
+        except OSError:
+            pass
+
+    def prometheus_text(self):
+        """Summaries of every phase in the Prometheus text exposition format"""
+        lines = [
+            "# HELP cuims_phase_seconds Time spent in each phase of a fetch.",
+            "# TYPE cuims_phase_seconds summary",
+        ]
+        failures = ["# HELP cuims_phase_failures_total Spans that ended in an exception.",
+                    "# TYPE cuims_phase_failures_total counter"]
+        with self._lock:
+            items = sorted((key, series.count, series.failures, series.total, list(series.samples))
+                           for key, series in self.series.items())
+        for (phase, labels), count, failed, total, samples in items:
+            base = ",".join([f'phase="{phase}"'] + [f'{name}="{value}"' for name, value in labels])
+            for q in QUANTILES:
+                lines.append(f'cuims_phase_seconds{{{base},quantile="{q}"}} {percentile(samples, q):.6f}')
+            lines.append(f"cuims_phase_seconds_sum{{{base}}} {total:.6f}")
+            lines.append(f"cuims_phase_seconds_count{{{base}}} {count}")
+            failures.append(f"cuims_phase_failures_total{{{base}}} {failed}")
+        return "\n".join(lines + failures) + "\n"
+
+    def write_prometheus(self, path=PROMETHEUS_FILE):
+        """Write prometheus_text() atomically, e.g. for node_exporter's textfile collector"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics in a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+metrics = Metrics(profile_phases=filter(None, os.environ.get("CUIMS_PROFILE", "").split(",")))
+span = metrics.span
+if os.environ.get("CUIMS_METRICS_PORT"):
+    metrics.serve(int(os.environ["CUIMS_METRICS_PORT"]))
+
+
+def summarize(path):
+    """{(phase, page): [seconds, ...]} and failure counts over every run recorded in a spans file"""
+    samples, failures = defaultdict(list), defaultdict(int)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            key = (event["phase"], event.get("page", ""))
+            samples[key].append(event["seconds"])
+            failures[key] += not event.get("ok", True)
+    return samples, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="p50/p95 per phase across recorded runs.")
+    parser.add_argument("spans", nargs="?", default=SPANS_FILE)
+    args = parser.parse_args(argv)
+
+    samples, failures = summarize(args.spans)
+    print(f"{'phase':<22}{'page':<12}{'count':>7}{'fail':>6}{'p50 s':>9}{'p95 s':>9}")
+    for (phase, page), values in sorted(samples.items()):
+        print(f"{phase:<22}{page:<12}{len(values):>7}{failures[(phase, page)]:>6}"
+              f"{percentile(values, 0.5):>9.3f}{percentile(values, 0.95):>9.3f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Parse raw portal pages on a pool of worker processes, for batch runs and replays of saved HTML.
+
+    python parse_pipeline.py pages/*.html -j 4 > tables.jsonl
+
+Each file's page is taken from its name ("attendance", "marks" or "timetable" anywhere in it)
+and one JSON line is written per file, in the order given.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import parsers
+
+PENDING_PER_WORKER = 4 # Pages queued per worker; bounds memory however long the input stream is
+
+ParseResult = namedtuple("ParseResult", "tag page table error")
+
+
+def parse_page(tag, page, html):
+    """ParseResult for one page; runs in a worker process, so failures come back as data"""
+    try:
+        return ParseResult(tag, page, parsers.parse_table(page, html), None)
+    except Exception as e:
+        return ParseResult(tag, page, None, f"{type(e).__name__}: {e}")
+
+
+def process_pool(workers=None):
+    # spawn, not fork: the batch engine forks from a process full of fetch threads
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def parse_stream(pages, workers=None, ordered=True, max_pending=None, executor=None):
+    """Yield a ParseResult for each (tag, page, html) in pages.
+
+    tag is passed through untouched, e.g. a UID or file name. With ordered=False results come
+    back as soon as they are parsed. At most max_pending pages are in flight at a time, so
+    pages can be a lazy iterator over an archive far larger than memory.
+    """
+    own_executor = executor is None
+    executor = executor or process_pool(workers)
+    max_pending = max_pending or PENDING_PER_WORKER * (workers or os.cpu_count())
+    in_flight = deque()
+    try:
+        for tag, page, html in pages:
+            if len(in_flight) >= max_pending:
+                yield from _collect(in_flight, ordered)
+            in_flight.append(executor.submit(parse_page, tag, page, html))
+        while in_flight:
+            yield from _collect(in_flight, ordered)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+
+def _collect(in_flight, ordered):
+    """Take the next result(s) off in_flight: the oldest if ordered, else whatever has finished"""
+    if ordered:
+        yield in_flight.popleft().result()
+        return
+    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+    for future in done:
+        in_flight.remove(future)
+        yield future.result()
+
+
+class ProcessParser:
+    """Stands in for parsers.parse_table, running each parse on a shared process pool"""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def __call__(self, page, html):
+        result = self.executor.submit(parse_page, None, page, html).result()
+        if result.error:
+            raise ValueError(f"Could not parse {page} page: {result.error}")
+        return result.table
+
+
+def page_for_file(path):
+    name = os.path.basename(path).lower()
+    for page in ("attendance", "marks", "timetable"):
+        if page in name:
+            return page
+    raise ValueError(f"Can't tell which page {path} is from its name")
+
+
+def read_pages(paths):
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield path, page_for_file(path), f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse saved portal pages into JSON lines.")
+    parser.add_argument("files", nargs="+", help="saved .html pages")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for result in parse_stream(read_pages(args.files), workers=args.jobs):
+        columns, rows = result.table[:2] if result.table else (None, None)
+        failed += result.table is None
+        print(json.dumps({"source": result.tag, "page": result.page, "columns": columns, "rows": rows,
+                          "error": result.error or (None if result.table else "table not found")},
+                         ensure_ascii=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
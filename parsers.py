@@ -0,0 +1,216 @@
+"""Portal page parsers.
+
+Each parser builds only the part of the page it reads: lxml does the tokenising and a
+SoupStrainer keeps just the tables (or marks accordion) in the tree, instead of building
+a full html.parser tree of the whole page.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER = "lxml"
+
+ATTENDANCE_TABLE_ID = "SortTable"
+COURSE_DETAIL_TABLE_ID = "ContentPlaceHolder1_grdCourseDetail"
+TIMETABLE_TABLE_ID = "ContentPlaceHolder1_grdMain"
+MARKS_CONTENT_CLASS = "ui-accordion-content"
+MARKS_ACCORDION_ID = "accordion"
+
+_attendance_strainer = SoupStrainer(id=ATTENDANCE_TABLE_ID)
+_timetable_strainer = SoupStrainer(id=[COURSE_DETAIL_TABLE_ID, TIMETABLE_TABLE_ID])
+# jQuery UI tags the accordion container, headers and panels with ui-accordion* classes
+_marks_strainer = SoupStrainer(["div", "h3"], class_=re.compile(r"\bui-accordion"))
+# The page as served, before jQuery UI has run: a bare <h3> then <div> per course inside #accordion
+_raw_marks_strainer = SoupStrainer(id=MARKS_ACCORDION_ID)
+
+Timetable = namedtuple("Timetable", "headers rows course_mapping")
+# What parse_table returns; course_mapping is the timetable's (None if its course detail table was missing)
+PageTable = namedtuple("PageTable", "columns rows course_mapping", defaults=(None,))
+
+
+def _element_end(html, tag, start):
+    """Index just past the tag opened at `start`, counting nested tags of the same name"""
+    depth = 0
+    for match in re.compile(rf"<(/?){tag}\b[^>]*>", re.I).finditer(html, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return len(html)
+
+
+def _element_by_id(html, tag, element_id):
+    match = re.search(rf"<{tag}\b[^>]*\bid=[\"']?{re.escape(element_id)}[\"'\s>]", html, re.I)
+    if not match:
+        return ""
+    return html[match.start():_element_end(html, tag, match.start())]
+
+
+def _marks_region(html):
+    first = html.find(MARKS_CONTENT_CLASS)
+    if first < 0:
+        return _element_by_id(html, "div", MARKS_ACCORDION_ID)
+    last = html.rfind(MARKS_CONTENT_CLASS)
+    start = html.rfind("<h3", 0, first)
+    last_div = html.rfind("<div", 0, last)
+    return html[max(start, 0):_element_end(html, "div", last_div)]
+
+
+_FRAGMENTS = {
+    "attendance": lambda html: _element_by_id(html, "table", ATTENDANCE_TABLE_ID),
+    "marks": _marks_region,
+    "timetable": lambda html: (_element_by_id(html, "table", COURSE_DETAIL_TABLE_ID)
+                               + _element_by_id(html, "table", TIMETABLE_TABLE_ID)),
+}
+
+
+def content_hash(html, page):
+    """Digest of just the tables a page's parser reads, found by a string scan rather than a parse.
+
+    Returns None when the tables are not on the page, so a broken page is never mistaken for an unchanged one.
+    """
+    fragment = _FRAGMENTS[page](html)
+    if not fragment:
+        return None
+    return hashlib.sha256(fragment.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def course_code_substituter(course_mapping):
+    """Build a function that replaces every course code in a cell with its title in one pass.
+
+    Codes are tried longest first so a code that is a prefix of another never wins.
+    """
+    codes = sorted((code for code in course_mapping if code), key=len, reverse=True)
+    if not codes:
+        return lambda text: text
+    pattern = re.compile("|".join(map(re.escape, codes)))
+    return lambda text: pattern.sub(lambda match: course_mapping[match.group(0)], text)
+
+
+def parse_attendance(html):
+    """Return (headers, rows) of the attendance summary, dropping the trailing report column, or None"""
+    soup = BeautifulSoup(html, PARSER, parse_only=_attendance_strainer)
+    table = soup.find("table", {"id": ATTENDANCE_TABLE_ID})
+    if not table:
+        return None
+    headers = [th.text.strip() for th in table.find_all("th")]
+    rows = [[td.text.strip() for td in tr.find_all("td")[:-1]] for tr in table.find("tbody").find_all("tr")]
+    return headers[:-1], rows
+
+
+def _is_marks_section(tag):
+    return tag.name == "h3" or (tag.name == "div" and MARKS_CONTENT_CLASS in (tag.get("class") or []))
+
+
+def _raw_marks_sections(html):
+    """Accordion panels of the page as a plain HTTP GET returns it, without jQuery UI's markup"""
+    soup = BeautifulSoup(html, PARSER, parse_only=_raw_marks_strainer)
+    accordion = soup.find(id=MARKS_ACCORDION_ID)
+    if accordion is None:
+        return []
+    sections = []
+    heading = None
+    for tag in accordion.find_all(["h3", "div"], recursive=False):
+        if tag.name == "h3":
+            heading = tag
+        elif heading is not None:
+            sections.append((heading, tag))
+            heading = None
+    return sections
+
+
+def _marks_sections(html):
+    """Return (course heading, content div) for every accordion panel, before or after jQuery UI has run"""
+    if MARKS_CONTENT_CLASS not in html:
+        return _raw_marks_sections(html)
+    soup = BeautifulSoup(html, PARSER, parse_only=_marks_strainer)
+    sections = []
+    heading = None
+    for tag in soup.find_all(_is_marks_section):
+        if tag.name == "h3":
+            heading = tag
+        elif heading is None:
+            # The headings carry no accordion class on this page; fall back to the whole document
+            soup = BeautifulSoup(html, PARSER)
+            return [(div.find_previous("h3"), div) for div in soup.select("." + MARKS_CONTENT_CLASS)]
+        else:
+            sections.append((heading, tag))
+    return sections
+
+
+def parse_marks(html):
+    """Return one dict per marks component row, each tagged with its "Course" """
+    return _marks_records(_marks_sections(html))
+
+
+def _marks_records(sections):
+    all_data = []
+    for heading, div in sections:
+        course = heading.get_text(strip=True)
+        table = div.find("table")
+        if not table: continue
+        headers = [th.get_text(strip=True) for th in table.find_all("th")]
+        for row in table.find("tbody").find_all("tr"):
+            cells = [td.get_text(strip=True) for td in row.find_all("td")]
+            if len(cells) == len(headers):
+                record = dict(zip(headers, cells))
+                record["Course"] = course
+                all_data.append(record)
+    return all_data
+
+
+def parse_timetable(html):
+    """Return a Timetable with course codes replaced by titles, or None if the timetable is missing.
+
+    course_mapping is None when the course detail table itself was not on the page.
+    """
+    soup = BeautifulSoup(html, PARSER, parse_only=_timetable_strainer)
+
+    course_table_html = soup.find("table", {"id": COURSE_DETAIL_TABLE_ID})
+    course_mapping = None
+    if course_table_html:
+        course_mapping = {}
+        for row in course_table_html.find_all("tr")[1:]:  # skip header
+            cols = [td.get_text(strip=True) for td in row.find_all("td")]
+            if len(cols) >= 2:
+                course_mapping[cols[0].strip()] = cols[1].strip()
+
+    timetable = soup.find("table", {"id": TIMETABLE_TABLE_ID})
+    if not timetable:
+        return None
+
+    headers = [th.get_text(strip=True) for th in timetable.find("tr").find_all("th")]
+    substitute = course_code_substituter(course_mapping or {})
+    rows = []
+    for tr in timetable.find_all("tr")[1:]:
+        cols = [td.get_text(strip=True) for td in tr.find_all("td")]
+        if not cols:
+            continue
+        # Replace just the code portions, keep any other text
+        rows.append([substitute(col) for col in cols])
+
+    return Timetable(headers, rows, course_mapping)
+
+
+def marks_table(records):
+    """Turn parse_marks records into (columns, rows), with "Course" first and missing cells blank"""
+    columns = ["Course"]
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    return columns, [[record.get(col, "") for col in columns] for record in records]
+
+
+def parse_table(page, html):
+    """A PageTable for any data page by name, or None if its table is missing"""
+    if page == "attendance":
+        attendance = parse_attendance(html)
+        return attendance and PageTable(*attendance)
+    if page == "marks":
+        # No accordion at all means the page didn't load properly, unlike a course with no marks yet
+        sections = _marks_sections(html)
+        return PageTable(*marks_table(_marks_records(sections))) if sections else None
+    if page == "timetable":
+        timetable = parse_timetable(html)
+        return timetable and PageTable(*timetable)
+    raise ValueError(f"Unknown page: {page}")
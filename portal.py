@@ -0,0 +1,116 @@
+"""Portal addresses and the pooled HTTP client used once the browser has logged in."""
+import os
+from collections import namedtuple
+from urllib.parse import urljoin
+
+# Point this at a local stand-in server (e.g. http://127.0.0.1:8000/) to run against recorded pages
+BASE_URL = os.environ.get("CUIMS_PORTAL_URL", "https://students.cuchd.in/")
+
+# Local state: cached driver path, saved sessions
+CACHE_DIR = os.environ.get("CUIMS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cuims"))
+
+HOME_PATH = "StudentHome.aspx"
+ATTENDANCE_PATH = "frmStudentCourseWiseAttendanceSummary.aspx?type=etgkYfqBdH1fSfc255iYGw=="
+MARKS_PATH = "frmStudentMarksView.aspx"
+TIMETABLE_PATH = "frmMyTimeTable.aspx"
+
+# How long a browser-rendered page may take to become ready, and how often to check
+HTTP_TIMEOUT = 30
+PAGE_TIMEOUT = float(os.environ.get("CUIMS_PAGE_TIMEOUT", "15"))
+PAGE_POLL_INTERVAL = float(os.environ.get("CUIMS_PAGE_POLL_INTERVAL", "0.25"))
+
+
+class Page(namedtuple("Page", "name path ready_selector")):
+    """A data page and the CSS selector that only matches once its content has rendered"""
+
+
+ATTENDANCE_PAGE = Page("attendance", ATTENDANCE_PATH, "#SortTable tbody")
+MARKS_PAGE = Page("marks", MARKS_PATH, ".ui-accordion-content table")
+TIMETABLE_PAGE = Page("timetable", TIMETABLE_PATH, "#ContentPlaceHolder1_grdMain")
+
+
+class SessionExpiredError(Exception):
+    """Raised when the portal redirects a page request back to the login screen"""
+
+
+class PortalHTTPSession:
+    """Keep-alive HTTP session that reuses the cookies of an authenticated browser"""
+
+    def __init__(self, base_url=BASE_URL, user_agent=None, pool_size=4, timeout=HTTP_TIMEOUT):
+        # Imported here so that reading the constants above stays cheap at startup
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.user_agent = user_agent
+        if user_agent:
+            # The portal ties the ASP.NET session to the browser it was created in
+            self.session.headers["User-Agent"] = user_agent
+
+    @classmethod
+    def from_driver(cls, driver, base_url=BASE_URL, **kwargs):
+        """Build a session from the cookies and user agent of a logged-in WebDriver"""
+        user_agent = driver.execute_script("return navigator.userAgent")
+        http = cls(base_url, user_agent=user_agent, **kwargs)
+        http.load_cookies(driver.get_cookies())
+        return http
+
+    @classmethod
+    def from_saved(cls, saved, base_url=BASE_URL, **kwargs):
+        """Rebuild a session from a session_store.SavedSession"""
+        http = cls(base_url, user_agent=saved.user_agent, **kwargs)
+        http.load_cookies(saved.cookies)
+        return http
+
+    def load_cookies(self, cookies):
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+
+    def cookies(self):
+        """Export the cookie jar in the same shape as WebDriver.get_cookies()"""
+        return [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expiry": c.expires}
+            for c in self.session.cookies
+        ]
+
+    def is_authenticated(self):
+        """One cheap request to check the portal still accepts our cookies.
+
+        Returns None rather than raising when the portal can't be reached or errors, which is
+        just as falsy but doesn't claim the cookies were rejected.
+        """
+        import requests
+
+        try:
+            self.get_page(HOME_PATH)
+            return True
+        except SessionExpiredError:
+            return False
+        except requests.RequestException:
+            return None
+
+    def url(self, path):
+        return urljoin(self.base_url, path)
+
+    def get_page(self, path):
+        """Return the HTML of a portal page, raising SessionExpiredError if we were logged out"""
+        url = self.url(path)
+        # An expired session is answered with a redirect to the login page, not an error status
+        response = self.session.get(url, timeout=self.timeout, allow_redirects=False)
+        if response.is_redirect:
+            raise SessionExpiredError(f"Redirected to {response.headers.get('Location')}")
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        self.session.close()
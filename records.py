@@ -0,0 +1,74 @@
+"""Compact in-memory model of the fetched pages.
+
+A Table is the one copy of a page that the tabs, the snapshot store and the batch exporter
+read. Rows are tuples and repeated cells (course names, component names, timings) are
+interned, so a page costs little more than its distinct strings, however many views hold it.
+The marks calculator reads the marks page as typed MarksComponent records instead of guessing
+column positions itself.
+"""
+import re
+import sys
+from collections import namedtuple
+
+MarksComponent = namedtuple("MarksComponent", "course name max_marks obtained") # Marks are floats or None
+
+NAME_COLUMNS = ("Name", "Eval Name", "Component")
+_OBTAINED = re.compile(r"obtain|secured|scored", re.I)
+_MAX = re.compile(r"max|out\s*of", re.I)
+
+
+def _cell(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+class Table:
+    """One page as its column names and a tuple of row tuples; treat it as immutable"""
+
+    __slots__ = ("page", "columns", "rows")
+
+    def __init__(self, page, columns, rows):
+        self.page = page
+        self.columns = tuple(columns)
+        self.rows = tuple(tuple(map(_cell, row)) for row in rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"<Table {self.page} {len(self.columns)} columns x {len(self.rows)} rows>"
+
+    def courses(self):
+        """Distinct values of the first column (the course on every page that has one), in order"""
+        return list(dict.fromkeys(row[0] for row in self.rows if row))
+
+    def as_dict(self):
+        """JSON-ready {"columns": [...], "rows": [[...]]}"""
+        return {"columns": list(self.columns), "rows": [list(row) for row in self.rows]}
+
+
+def marks_columns(columns):
+    """(name, obtained, max) column names of the marks table; max is None if there isn't one"""
+    rest = [col for col in columns if col != "Course"]
+    name = next((col for col in NAME_COLUMNS if col in rest), rest[0])
+    obtained = next((col for col in rest if _OBTAINED.search(col)), rest[-1])
+    maximum = next((col for col in rest if _MAX.search(col) and col not in (name, obtained)), None)
+    return name, obtained, maximum
+
+
+def marks_components(table):
+    """The rows of a marks Table as MarksComponent records; marks that aren't numbers are None"""
+    if not table.rows or len(table.columns) < 2:
+        return []
+    course, (name, obtained, maximum) = table.columns.index("Course"), marks_columns(table.columns)
+    name, obtained = table.columns.index(name), table.columns.index(obtained)
+    maximum = table.columns.index(maximum) if maximum else None
+    return [MarksComponent(row[course], row[name], _number(row[maximum]) if maximum is not None else None,
+                           _number(row[obtained]))
+            for row in table.rows]
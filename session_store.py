@@ -0,0 +1,84 @@
+"""Encrypted on-disk cache of authenticated portal sessions, keyed by UID."""
+import base64
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from portal import CACHE_DIR
+
+SESSIONS_DIR = os.path.join(CACHE_DIR, "sessions")
+SALT_SIZE = 16
+KDF_ITERATIONS = 200_000
+
+
+@dataclass
+class SavedSession:
+    cookies: list
+    user_agent: str = None
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    # Shortest idle gap after which the portal was seen to drop the session, once observed
+    lifetime: float = None
+
+    def is_stale(self, now=None):
+        """True when the session is known to be dead without asking the portal"""
+        now = time.time() if now is None else now
+        if self.lifetime is not None and now - self.last_used >= self.lifetime:
+            return True
+        return any(c.get("expiry") is not None and c["expiry"] <= now for c in self.cookies)
+
+    def record_expiry(self, now=None):
+        """Remember the idle gap that killed this session so later checks can skip the request"""
+        now = time.time() if now is None else now
+        gap = now - self.last_used
+        self.lifetime = gap if self.lifetime is None else min(self.lifetime, gap)
+
+
+class SessionStore:
+    """Sessions are encrypted with a key derived from the account password, so a copied file is useless alone"""
+
+    def __init__(self, directory=SESSIONS_DIR):
+        self.directory = directory
+
+    def _path(self, uid):
+        name = hashlib.sha256(uid.strip().lower().encode()).hexdigest()
+        return os.path.join(self.directory, name + ".session")
+
+    @staticmethod
+    def _fernet(password, salt):
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(kdf.derive(password.encode())))
+
+    def load(self, uid, password):
+        """Return the SavedSession for uid, or None if there is none or it cannot be decrypted"""
+        try:
+            with open(self._path(uid), "rb") as f:
+                blob = f.read()
+            payload = self._fernet(password, blob[:SALT_SIZE]).decrypt(blob[SALT_SIZE:])
+            return SavedSession(**json.loads(payload))
+        except (OSError, InvalidToken, ValueError, TypeError):
+            return None
+
+    def save(self, uid, password, session):
+        os.makedirs(self.directory, exist_ok=True)
+        salt = os.urandom(SALT_SIZE)
+        token = self._fernet(password, salt).encrypt(json.dumps(asdict(session)).encode())
+        path = self._path(uid)
+        tmp_path = path + ".tmp"
+        # Owner-only permissions; the cookies are as good as a login
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(salt + token)
+        os.replace(tmp_path, path)
+
+    def discard(self, uid):
+        try:
+            os.remove(self._path(uid))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,111 @@
+"""Local SQLite history of every successful fetch, one versioned snapshot per UID and page."""
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import closing
+
+from portal import CACHE_DIR
+
+SNAPSHOT_DB = os.path.join(CACHE_DIR, "snapshots.db")
+
+Snapshot = namedtuple("Snapshot", "uid page version fetched_at columns rows")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL,
+    page TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    columns TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    UNIQUE (uid, page, version)
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_time ON snapshots (uid, page, fetched_at);
+"""
+
+
+class SnapshotStore:
+    """Each call opens its own connection, so calls from different threads never share one.
+
+    SQLite serializes the writes; save() picks and inserts a version in a single statement so that
+    concurrent saves of the same page each get their own.
+    """
+
+    def __init__(self, path=SNAPSHOT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def _snapshot(row):
+        uid, page, version, fetched_at, columns, rows = row
+        return Snapshot(uid, page, version, fetched_at, json.loads(columns), json.loads(rows))
+
+    def save(self, uid, page, columns, rows, fetched_at=None):
+        """Store a new version of a page and return its version number"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with closing(self._connect()) as conn, conn:
+            # One statement picks the next version and inserts it, so concurrent saves can't both claim it
+            cursor = conn.execute(
+                """INSERT INTO snapshots (uid, page, version, fetched_at, columns, rows)
+                   SELECT ?, ?, COALESCE(MAX(version), 0) + 1, ?, ?, ? FROM snapshots WHERE uid = ? AND page = ?""",
+                (uid, page, fetched_at, json.dumps(list(columns)), json.dumps(rows, default=str), uid, page),
+            )
+            (version,) = conn.execute("SELECT version FROM snapshots WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        return version
+
+    def latest_uid(self):
+        """The UID fetched most recently, or None on a fresh install"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT uid FROM snapshots ORDER BY fetched_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def latest(self, uid):
+        """Return {page: Snapshot} with the newest snapshot of each page for uid"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """SELECT s.uid, s.page, s.version, s.fetched_at, s.columns, s.rows FROM snapshots s
+                   JOIN (SELECT page, MAX(version) AS version FROM snapshots WHERE uid = ? GROUP BY page) m
+                   ON s.page = m.page AND s.version = m.version
+                   WHERE s.uid = ?""",
+                (uid, uid),
+            ).fetchall()
+        return {row[1]: self._snapshot(row) for row in rows}
+
+    def history(self, uid, page, since=None, until=None):
+        """Snapshots of one page in fetch order, optionally limited to a time range"""
+        query = "SELECT uid, page, version, fetched_at, columns, rows FROM snapshots WHERE uid = ? AND page = ?"
+        params = [uid, page]
+        if since is not None:
+            query += " AND fetched_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND fetched_at < ?"
+            params.append(until)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + " ORDER BY fetched_at", params).fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def column_history(self, uid, page, key, column, since=None, until=None):
+        """[(fetched_at, value)] of one cell over time, e.g. a course's attendance percentage.
+
+        The row is found by its first cell (the course code on the attendance page).
+        """
+        series = []
+        for snapshot in self.history(uid, page, since, until):
+            if column not in snapshot.columns:
+                continue
+            index = snapshot.columns.index(column)
+            for row in snapshot.rows:
+                if row and row[0] == key:
+                    series.append((snapshot.fetched_at, row[index]))
+                    break
+        return series
@@ -0,0 +1,255 @@
+"""Treeview wrapper that stays responsive with large tables."""
+import tkinter.font as tkfont
+from tkinter import ttk
+
+CHUNK_SIZE = 200 # Rows inserted per Tk event-loop tick
+VIRTUAL_THRESHOLD = 2000 # Above this many rows only the visible window is materialized
+WIDTH_SAMPLE_SIZE = 50 # Rows measured when sizing columns
+MIN_COLUMN_WIDTH = 60
+MAX_COLUMN_WIDTH = 400
+COLUMN_PADDING = 20
+CHANGED_BACKGROUND = "#fff3b0"
+CHANGED_CELL_FORMAT = "{old} → {new}"
+
+
+def _row_keys(rows, key_width):
+    """Identity of each row: its first key_width cells, plus an occurrence count for repeats"""
+    seen = {}
+    keys = []
+    for row in rows:
+        key = tuple(row[:key_width])
+        seen[key] = seen.get(key, 0) + 1
+        keys.append((key, seen[key]))
+    return keys
+
+
+class TableView:
+    """A Treeview with a scrollbar, filled in chunks scheduled with after().
+
+    Tables larger than virtual_threshold switch to a virtual view: the tree holds only
+    as many items as fit on screen and scrolling rewrites their values in place.
+
+    Refreshes go through update_data, which matches rows on their first key_width cells
+    (e.g. the course code) and only touches rows that changed.
+    """
+
+    def __init__(self, parent, chunk_size=CHUNK_SIZE, virtual_threshold=VIRTUAL_THRESHOLD, key_width=1):
+        self.chunk_size = chunk_size
+        self.virtual_threshold = virtual_threshold
+        self.key_width = key_width
+        self.columns = []
+        self.rows = []
+        self.changes = {} # row index -> {column index: previous value}, or None for a new row
+        self._virtual = False
+        self._offset = 0
+        self._job = None
+        self._on_done = None # Called when the chunked fill in progress completes
+
+        frame = ttk.Frame(parent)
+        frame.pack(fill="both", expand=True, padx=5, pady=5) # Added padding to treeview
+        self.tree = ttk.Treeview(frame, show="headings")
+        self.scrollbar = ttk.Scrollbar(frame, orient="vertical")
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.tree.tag_configure("changed", background=CHANGED_BACKGROUND)
+        self._attach_native_scrolling()
+
+        self.tree.bind("<Configure>", self._on_configure)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_mousewheel)
+
+    def set_data(self, columns, rows, on_done=None):
+        """Replace the table contents; rows is a list of value sequences.
+
+        on_done() is called once every row is in the tree, which for a chunked fill is a few
+        event-loop ticks after this returns.
+        """
+        self.clear()
+        self._on_done = on_done
+        self.columns = list(columns)
+        self.rows = rows
+        self.tree["columns"] = self.columns
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+        self._autosize_columns()
+
+        self._virtual = len(rows) > self.virtual_threshold
+        if self._virtual:
+            self.scrollbar.configure(command=self._on_scroll)
+            self.tree.configure(yscrollcommand="")
+            self._render_window()
+            self._finished()
+        else:
+            self._insert_chunk(0)
+
+    def update_data(self, columns, rows, on_done=None):
+        """Apply new contents as a row-level diff and highlight what changed; returns False if nothing did.
+
+        on_done() is called once the tree shows the new contents, as for set_data.
+        """
+        columns = list(columns)
+        switches_view = (len(rows) > self.virtual_threshold) != self._virtual
+        if columns != self.columns or not self.rows or self._job is not None or switches_view:
+            self.set_data(columns, rows, on_done)
+            return True
+        changed = self._apply_diff(rows)
+        if on_done is not None:
+            on_done()
+        return changed
+
+    def _apply_diff(self, rows):
+        old_keys = _row_keys(self.rows, self.key_width)
+        old_index = {key: i for i, key in enumerate(old_keys)}
+        new_keys = _row_keys(rows, self.key_width)
+        changes = {}
+        for i, (key, row) in enumerate(zip(new_keys, rows)):
+            j = old_index.get(key)
+            if j is None:
+                changes[i] = None
+                continue
+            old = self.rows[j]
+            cells = {c: (old[c] if c < len(old) else "") for c, value in enumerate(row) if c >= len(old) or old[c] != value}
+            if cells:
+                changes[i] = cells
+        if not changes and new_keys == old_keys:
+            return False
+
+        items = self.tree.get_children()
+        self.rows = rows
+        self.changes = changes
+        if self._virtual:
+            self._render_window()
+            return True
+
+        item_by_key = dict(zip(old_keys, items))
+        reordered = new_keys != old_keys
+        kept = set()
+        for i, key in enumerate(new_keys):
+            iid = item_by_key.get(key)
+            if iid is None:
+                iid = self.tree.insert("", i, values=self._display(i), tags=self._tags(i))
+            else:
+                if i in changes or self.tree.item(iid, "tags"):
+                    self.tree.item(iid, values=self._display(i), tags=self._tags(i))
+                if reordered and self.tree.index(iid) != i:
+                    self.tree.move(iid, "", i)
+            kept.add(iid)
+        removed = [iid for iid in items if iid not in kept]
+        if removed:
+            self.tree.delete(*removed)
+        return True
+
+    def clear_highlights(self):
+        """Show every row as plain values again, dropping the marks left by the last update_data"""
+        if not self.changes:
+            return
+        changed, self.changes = self.changes, {}
+        if self._virtual:
+            self._render_window()
+            return
+        items = self.tree.get_children()
+        for i in changed:
+            self.tree.item(items[i], values=self.rows[i], tags=())
+
+    def clear(self):
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+        self._on_done = None # A fill cut short never completes
+        self.tree.delete(*self.tree.get_children())
+        self.rows = []
+        self.changes = {}
+        self._offset = 0
+        if self._virtual:
+            self._virtual = False
+            self._attach_native_scrolling()
+
+    def _attach_native_scrolling(self):
+        self.scrollbar.configure(command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+
+    def _autosize_columns(self):
+        """Size each column to its heading and a spread-out sample of rows"""
+        font = tkfont.nametofont("TkDefaultFont")
+        step = max(1, len(self.rows) // WIDTH_SAMPLE_SIZE)
+        sample = self.rows[::step][:WIDTH_SAMPLE_SIZE]
+        for i, col in enumerate(self.columns):
+            width = max([font.measure(col)] + [font.measure(str(row[i])) for row in sample if i < len(row)])
+            width = min(max(width + COLUMN_PADDING, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+            self.tree.column(col, width=width, anchor="center")
+
+    def _display(self, i):
+        """Row values as shown, with changed cells reading "old → new" """
+        row = self.rows[i]
+        cells = self.changes.get(i)
+        if not cells:
+            return row
+        return [CHANGED_CELL_FORMAT.format(old=cells[c], new=value) if c in cells else value for c, value in enumerate(row)]
+
+    def _tags(self, i):
+        return ("changed",) if i in self.changes else ()
+
+    def _insert_chunk(self, start):
+        end = start + self.chunk_size
+        for values in self.rows[start:end]:
+            self.tree.insert("", "end", values=values)
+        if end < len(self.rows):
+            # Yield to the event loop so the window keeps redrawing between chunks
+            self._job = self.tree.after(1, self._insert_chunk, end)
+        else:
+            self._job = None
+            self._finished()
+
+    def _finished(self):
+        on_done, self._on_done = self._on_done, None
+        if on_done is not None:
+            on_done()
+
+    def _page_size(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # One row's worth of height goes to the headings
+        return max(1, self.tree.winfo_height() // row_height - 1)
+
+    def _render_window(self):
+        total = len(self.rows)
+        page = self._page_size()
+        self._offset = max(0, min(self._offset, total - page))
+        window = self.rows[self._offset:self._offset + page]
+
+        items = self.tree.get_children()
+        if len(items) > len(window):
+            self.tree.delete(*items[len(window):])
+        for i, iid in enumerate(items[:len(window)], self._offset):
+            self.tree.item(iid, values=self._display(i), tags=self._tags(i))
+        for i in range(self._offset + len(items), self._offset + len(window)):
+            self.tree.insert("", "end", values=self._display(i), tags=self._tags(i))
+
+        if total:
+            self.scrollbar.set(self._offset / total, (self._offset + len(window)) / total)
+
+    def _scroll_to(self, offset):
+        self._offset = int(offset)
+        self._render_window()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * len(self.rows))
+        elif action == "scroll":
+            step = self._page_size() if unit == "pages" else 1
+            self._scroll_to(self._offset + int(amount) * step)
+
+    def _on_configure(self, event):
+        if self._virtual:
+            self._render_window()
+
+    def _on_mousewheel(self, event):
+        if not self._virtual:
+            return None
+        if event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            delta = -3 if event.delta > 0 else 3
+        self._scroll_to(self._offset + delta)
+        return "break"
@@ -0,0 +1,67 @@
+"""Single channel for worker threads to update Tk widgets."""
+import queue
+
+DRAIN_INTERVAL_MS = 50
+MAX_BATCH = 1000 # Updates applied per tick before yielding back to the event loop
+
+_LOG = object()
+
+
+class UIQueue:
+    """Worker threads post updates here and the Tk main loop applies them on an after() tick.
+
+    Consecutive log lines in a batch are merged into one write, so a burst of messages
+    costs one Text insert and one scroll rather than one of each per line.
+    """
+
+    def __init__(self, root, write_log, interval_ms=DRAIN_INTERVAL_MS, max_batch=MAX_BATCH):
+        self.root = root
+        self.write_log = write_log
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._job = None
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def post(self, callback, *args):
+        """Run callback(*args) on the Tk thread; safe to call from any thread"""
+        self._queue.put((callback, args))
+
+    def post_log(self, message):
+        self._queue.put((_LOG, message))
+
+    def _drain(self):
+        lines = []
+        count = 0
+        try:
+            while count < self.max_batch:
+                try:
+                    callback, args = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                count += 1
+                if callback is _LOG:
+                    lines.append(args)
+                    continue
+                if lines:
+                    # Keep log output in order relative to the update that follows it
+                    self.write_log(lines)
+                    lines = []
+                try:
+                    callback(*args)
+                except Exception as e:
+                    lines.append(f"❌ UI update failed: {e}")
+            if lines:
+                self.write_log(lines)
+        finally:
+            # Come straight back if the batch limit cut this tick short
+            delay = 1 if count >= self.max_batch else self.interval_ms
+            self._job = self.root.after(delay, self._drain)
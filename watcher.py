@@ -0,0 +1,101 @@
+"""Background re-fetching of portal pages, each on its own interval."""
+import random
+import threading
+import time
+
+# Seconds between checks of each page when the portal is healthy
+DEFAULT_INTERVALS = {
+    "marks": 15 * 60,
+    "attendance": 30 * 60,
+    "timetable": 6 * 60 * 60,
+}
+MAX_BACKOFF = 6 * 60 * 60 # Longest wait after repeated failures
+SLOW_AFTER = 20 # A fetch taking longer than this many seconds counts as the portal struggling
+JITTER = 0.1 # Each wait is randomly stretched or shrunk by up to this fraction
+
+
+class PageSchedule:
+    def __init__(self, name, fetch, interval):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.failures = 0 # Consecutive failed or slow fetches
+        self.next_due = 0.0
+
+
+class Watcher:
+    """Runs each page's fetch when it falls due, backing off exponentially while the portal errors or is slow.
+
+    fetch() returns new data when the page changed, None when it did not, and raises on failure.
+    clock and rng can be replaced to drive the schedule deterministically.
+    """
+
+    def __init__(self, fetchers, intervals=None, on_change=None, on_error=None, clock=time.monotonic,
+                 rng=None, jitter=JITTER, max_backoff=MAX_BACKOFF, slow_after=SLOW_AFTER):
+        intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.schedules = [PageSchedule(name, fetch, intervals[name]) for name, fetch in fetchers.items()]
+        self.on_change = on_change
+        self.on_error = on_error
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.slow_after = slow_after
+        self._stop = threading.Event()
+        self._thread = None
+        now = clock()
+        for schedule in self.schedules:
+            schedule.next_due = now + self.delay_for(schedule)
+
+    def delay_for(self, schedule):
+        delay = min(schedule.interval * 2 ** schedule.failures, self.max_backoff)
+        # Spread accounts and pages out so they don't all hit the portal at the same moment
+        return delay * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def due_in(self):
+        """Seconds until the next page is due (0 if one already is)"""
+        return max(0.0, min(s.next_due for s in self.schedules) - self.clock())
+
+    def run_pending(self):
+        """Fetch every page that is due; returns the names of pages that changed"""
+        changed = []
+        for schedule in self.schedules:
+            if self.clock() < schedule.next_due or self._stop.is_set():
+                continue
+            started = self.clock()
+            try:
+                result = schedule.fetch()
+            except Exception as e:
+                schedule.failures += 1
+                if self.on_error:
+                    self.on_error(schedule.name, e)
+            else:
+                slow = self.clock() - started > self.slow_after
+                schedule.failures = schedule.failures + 1 if slow else 0
+                if result is not None:
+                    changed.append(schedule.name)
+                    # A fetch that was in flight when stop() was called may belong to a session since replaced
+                    if self.on_change and not self._stop.is_set():
+                        self.on_change(schedule.name, result)
+            schedule.next_due = self.clock() + self.delay_for(schedule)
+        return changed
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=False):
+        """Stop scheduling fetches; with wait, also block until a fetch already under way has finished"""
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        while not self._stop.wait(self.due_in()):
+            self.run_pending()